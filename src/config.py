@@ -5,8 +5,27 @@ Loads environment variables from .env file and provides configuration values.
 """
 
 import os
+import re
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
+
+# Parsed .env contents keyed by (path, mtime_ns) so repeated Config()
+# construction does not re-read the file unless it has changed
+_ENV_CACHE: Dict[Tuple[Path, int], Dict[str, str]] = {}
+
+# Values this module wrote into os.environ from .env, so a re-parse after the
+# file changes can replace them while real environment variables still win
+_ENV_APPLIED: Dict[str, str] = {}
+
+# KEY=value lines, with an optional leading `export `
+_ENV_RE = re.compile(r'^[ \t]*(?:export[ \t]+)?([A-Za-z_]\w*)[ \t]*=[ \t]*(.*?)[ \t\r]*$', re.MULTILINE)
+
+
+def _strip_quotes(value: str) -> str:
+    """Remove one pair of matching surrounding quotes from a .env value"""
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        return value[1:-1]
+    return value
 
 
 class Config:
@@ -26,19 +45,52 @@ class Config:
         # Python virtual environment (for reference)
         self.PATH_TO_PYTHON_VENV = os.getenv('PATH_TO_PYTHON_VENV')
 
+        # Article pairs inserted per batch by the load command
+        self.PAIR_INSERT_BATCH_SIZE = int(os.getenv('PAIR_INSERT_BATCH_SIZE', '20000'))
+
+        # Maximum number of article embeddings kept in memory
+        self.EMBED_CACHE_SIZE = int(os.getenv('EMBED_CACHE_SIZE', '200000'))
+
+        # Worker processes used to encode embeddings on CPU; opt-in, since each
+        # worker loads its own copy of the model. 1 encodes in-process
+        self.EMBED_WORKERS = int(os.getenv('EMBED_WORKERS', '1'))
+
+        # Directory holding embeddings persisted across embeddingsearch runs
+        self.EMBED_STORE_DIR = os.getenv('EMBED_STORE_DIR') or str(Path(self.PATH_TO_DATABASE) / 'deduper_embeddings')
+
+        # Raw-to-canonical URL mapping persisted across urlcheck runs
+        self.URL_CACHE_PATH = os.getenv('URL_CACHE_PATH') or str(Path(self.PATH_TO_DATABASE) / 'deduper_url_cache.json')
+
         # Validate paths
         self._validate_config()
 
     def _load_dotenv(self):
         """Load environment variables from .env file"""
         env_path = Path(__file__).parent.parent / '.env'
-        if env_path.exists():
-            with open(env_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        os.environ[key.strip()] = value.strip()
+        try:
+            mtime_ns = env_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+
+        cache_key = (env_path, mtime_ns)
+        values = _ENV_CACHE.get(cache_key)
+        if values is None:
+            text = env_path.read_text()
+            values = {key: _strip_quotes(value) for key, value in _ENV_RE.findall(text)}
+            _ENV_CACHE[cache_key] = values
+
+        # Drop values an earlier parse applied that the edited file no longer has
+        for key in list(_ENV_APPLIED):
+            if key not in values and os.environ.get(key) == _ENV_APPLIED.pop(key):
+                del os.environ[key]
+
+        # Variables already set in the environment take precedence, except
+        # ones that were themselves applied from an earlier version of .env
+        for key, value in values.items():
+            current = os.environ.get(key)
+            if current is None or current == _ENV_APPLIED.get(key):
+                os.environ[key] = value
+                _ENV_APPLIED[key] = value
 
     def _get_required_env(self, key: str) -> str:
         """Get required environment variable or raise error"""
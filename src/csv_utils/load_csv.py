@@ -5,11 +5,42 @@ Handles loading and validation of article IDs from CSV files.
 """
 
 import csv
+from array import array
+from itertools import islice
 from pathlib import Path
-from typing import List, Set, Tuple
+from typing import Iterable, Iterator, List, Set, Tuple, Union
 
 from db import DatabaseManager
 
+# Range of a signed 64-bit integer, the widest ID array('q') can hold
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _parse_rows(reader: Iterable[List[str]], idx: int) -> Iterator[int]:
+    """Yield integer article IDs from CSV rows, skipping blank and invalid values"""
+    for row_num, row in enumerate(reader, start=2):  # Start at 2 for header
+        if len(row) <= idx:
+            continue  # Skip blank or short rows
+
+        article_id_str = row[idx].strip()
+
+        if not article_id_str:
+            continue  # Skip empty rows
+
+        try:
+            article_id = int(article_id_str)
+        except ValueError:
+            print(f"Warning: Invalid article ID '{article_id_str}' at row {row_num}")
+            continue
+
+        # IDs are packed into array('q'); SQLite rowids are 64-bit as well
+        if not _INT64_MIN <= article_id <= _INT64_MAX:
+            print(f"Warning: Article ID '{article_id_str}' at row {row_num} is out of range")
+            continue
+
+        yield article_id
+
 
 class CSVLoader:
     """Handles loading article IDs from CSV files"""
@@ -17,7 +48,7 @@ class CSVLoader:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
 
-    def load_article_ids_from_csv(self, csv_path: Path, validate_articles: bool = True) -> Tuple[List[int], Set[int]]:
+    def load_article_ids_from_csv(self, csv_path: Path, validate_articles: bool = True) -> Tuple[array, Set[int]]:
         """
         Load article IDs from CSV file.
 
@@ -26,59 +57,52 @@ class CSVLoader:
             validate_articles: Whether to validate that articles exist in database
 
         Returns:
-            Tuple of (valid_article_ids, invalid_article_ids)
+            Tuple of (valid_article_ids as array('q'), invalid_article_ids)
         """
         if not csv_path.exists():
             raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
-        article_ids = []
         invalid_ids = set()
 
         try:
-            with open(csv_path, 'r', encoding='utf-8-sig') as file:  # utf-8-sig handles BOM
-                reader = csv.DictReader(file)
+            # Read the whole file in one go; utf-8-sig handles BOM
+            lines = csv_path.read_bytes().decode('utf-8-sig').splitlines()
+
+            if lines and lines[0].strip() == 'articleId' and not any('"' in line or ',' in line for line in lines):
+                # Single unquoted column with no delimiters: every line is the
+                # value, no csv parsing needed
+                rows = ([line] for line in lines[1:])
+                idx = 0
+            else:
+                reader = csv.reader(lines)
 
-                # Clean fieldnames to remove any BOM or whitespace
-                if reader.fieldnames:
-                    reader.fieldnames = [field.strip() for field in reader.fieldnames]
+                # Clean header to remove any BOM or whitespace
+                header = [field.strip() for field in next(reader, [])]
 
                 # Validate header
-                if 'articleId' not in reader.fieldnames:
-                    print(f"Available columns: {reader.fieldnames}")
+                if 'articleId' not in header:
+                    print(f"Available columns: {header}")
                     raise ValueError("CSV file must have 'articleId' column")
 
-                # Load article IDs
-                for row_num, row in enumerate(reader, start=2):  # Start at 2 for header
-                    article_id_str = row.get('articleId', '').strip()
+                # Cache the column index so rows are plain list lookups
+                idx = header.index('articleId')
+                rows = reader
 
-                    if not article_id_str:
-                        continue  # Skip empty rows
-
-                    try:
-                        article_id = int(article_id_str)
-                        article_ids.append(article_id)
-                    except ValueError:
-                        print(f"Warning: Invalid article ID '{article_id_str}' at row {row_num}")
-                        continue
+            # Load article IDs, removing duplicates while preserving order
+            # and storing them as packed 64-bit ints rather than Python int objects
+            unique_article_ids = array('q', dict.fromkeys(_parse_rows(rows, idx)))
 
         except Exception as e:
             raise ValueError(f"Error reading CSV file: {e}")
 
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_article_ids = []
-        for article_id in article_ids:
-            if article_id not in seen:
-                seen.add(article_id)
-                unique_article_ids.append(article_id)
-
         print(f"Loaded {len(unique_article_ids)} unique article IDs from CSV")
 
         # Validate that articles exist in database
         if validate_articles and unique_article_ids:
-            valid_ids = []
+            existing_ids = self.db_manager.get_all_article_ids()
+            valid_ids = array('q')
             for article_id in unique_article_ids:
-                if self.db_manager.check_article_exists(article_id):
+                if article_id in existing_ids:
                     valid_ids.append(article_id)
                 else:
                     invalid_ids.add(article_id)
@@ -89,44 +113,58 @@ class CSVLoader:
 
         return unique_article_ids, set()
 
-    def validate_csv_format(self, csv_path: Path) -> bool:
+    def validate_csv_format(self, csv_source: Union[Path, Iterable[str]]) -> bool:
         """
         Validate that CSV file has correct format.
 
+        Only the header and first few rows are read, so passing an
+        already-open file or list of lines does not decode the rest.
+
         Args:
-            csv_path: Path to CSV file
+            csv_source: Path to CSV file, or an iterable of its lines
 
         Returns:
             True if format is valid
         """
-        if not csv_path.exists():
+        if not isinstance(csv_source, Path):
+            return self._validate_csv_lines(csv_source)
+
+        if not csv_source.exists():
+            return False
+
+        try:
+            with open(csv_source, 'r', encoding='utf-8-sig') as file:  # Handle BOM
+                return self._validate_csv_lines(file)
+        except Exception:
             return False
 
+    def _validate_csv_lines(self, lines: Iterable[str]) -> bool:
+        """Check header and first 5 data rows of CSV lines"""
         try:
-            with open(csv_path, 'r', encoding='utf-8-sig') as file:  # Handle BOM
-                reader = csv.DictReader(file)
+            reader = csv.reader(islice(lines, 6))  # Header + first 5 rows
+
+            # Clean header to remove any BOM or whitespace
+            header = [field.strip() for field in next(reader, [])]
 
-                # Clean fieldnames to remove any BOM or whitespace
-                if reader.fieldnames:
-                    reader.fieldnames = [field.strip() for field in reader.fieldnames]
+            # Check header
+            if 'articleId' not in header:
+                return False
 
-                # Check header
-                if 'articleId' not in reader.fieldnames:
-                    return False
+            idx = header.index('articleId')
 
-                # Check first few rows have valid data
-                for i, row in enumerate(reader):
-                    if i >= 5:  # Check first 5 rows
-                        break
+            # Check first few rows have valid data
+            for row in reader:
+                if len(row) <= idx:
+                    continue
 
-                    article_id_str = row.get('articleId', '').strip()
-                    if article_id_str:
-                        try:
-                            int(article_id_str)
-                        except ValueError:
-                            return False
+                article_id_str = row[idx].strip()
+                if article_id_str:
+                    try:
+                        int(article_id_str)
+                    except ValueError:
+                        return False
 
             return True
 
         except Exception:
-            return False
\ No newline at end of file
+            return False
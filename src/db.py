@@ -4,47 +4,211 @@ Database connection and helper utilities for NewsNexus Deduper
 Provides SQLite connection management and common database operations.
 """
 
+import atexit
 import sqlite3
+from array import array
 from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import chain, islice
 from pathlib import Path
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Set, Iterable
 
 from config import Config
 
 
+def utc_timestamp() -> str:
+    """Current UTC time in the same format as SQLite's datetime('now')"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
 class DatabaseManager:
     """Manages SQLite database connections and operations"""
 
-    def __init__(self, config: Config):
+    # ArticleDuplicateRatings metric columns that update_scores_batch may write
+    SCORE_COLUMNS = ('urlCheck', 'contentHash', 'embeddingSearch')
+
+    # Pairs per multi-row INSERT: 2 parameters each plus the shared timestamp
+    # stays within SQLite's historical 999 host-parameter limit
+    PAIRS_PER_INSERT = 499
+
+    # IDs per IN (...) lookup, also within the 999 host-parameter limit
+    IDS_PER_LOOKUP = 500
+
+    def __init__(self, config: Config, read_only: bool = False):
+        """
+        Open the shared connection.
+
+        Args:
+            config: Deduper configuration
+            read_only: Skip schema setup (indexes, ANALYZE, journal mode) and
+                refuse writes, for reporting commands such as status
+        """
         self.config = config
         self.db_path = config.database_path
+        self.read_only = read_only
+
+        # One long-lived connection so prepared statements stay cached and
+        # PRAGMAs are applied once. isolation_level=None puts the driver in
+        # autocommit mode; transactions are managed in get_connection().
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row  # Enable column access by name
 
         # Enable WAL mode for better concurrency
         self._setup_database()
 
+        # Run PRAGMA optimize and close cleanly when the CLI exits
+        atexit.register(self.close)
+
     def _setup_database(self):
         """Set up database with optimal settings"""
-        with self.get_connection() as conn:
-            # Enable WAL mode for better performance
-            conn.execute("PRAGMA journal_mode=WAL")
-            # Increase cache size
-            conn.execute("PRAGMA cache_size=-64000")  # 64MB cache
-            # Enable foreign key constraints
-            conn.execute("PRAGMA foreign_keys=ON")
+        if self.read_only:
+            # Per-connection tuning only; query_only makes SQLite reject any
+            # write, so the shared database is left exactly as it was found
+            self._conn.executescript("""
+                PRAGMA cache_size=-262144;
+                PRAGMA mmap_size=1073741824;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA query_only=ON;
+            """)
+            return
+
+        # Applied once on the persistent connection, in a single call
+        self._conn.executescript("""
+            -- Enable WAL mode for better performance
+            PRAGMA journal_mode=WAL;
+            -- Increase cache size (256MB); pages are only allocated as used
+            PRAGMA cache_size=-262144;
+            -- Enable foreign key constraints
+            PRAGMA foreign_keys=ON;
+            -- Fewer fsyncs; under WAL this stays corruption-safe, a power loss
+            -- can only drop the most recently committed transaction
+            PRAGMA synchronous=NORMAL;
+            -- Memory-mapped reads for the large scan/join queries (1GB)
+            PRAGMA mmap_size=1073741824;
+            -- Keep temp b-trees (sorts, DISTINCT) in memory
+            PRAGMA temp_store=MEMORY;
+            -- Checkpoint less often during bulk inserts/updates
+            PRAGMA wal_autocheckpoint=10000;
+        """)
+
+        self._ensure_indexes()
+        self._create_staging_tables()
+
+    def _create_staging_tables(self):
+        """Create the connection-lifetime temp tables that batch updates are staged in"""
+        # Created once per connection; each use empties them afterwards
+        self._conn.executescript("""
+            CREATE TEMP TABLE IF NOT EXISTS ScoreUpdates (id INTEGER PRIMARY KEY, score REAL);
+            CREATE TEMP TABLE IF NOT EXISTS ArticleCanon (id INTEGER PRIMARY KEY, canon INTEGER);
+        """)
+
+    def _ensure_indexes(self):
+        """Create indexes used by the metric passes if they are missing"""
+        self._ensure_pair_unique_index()
+
+        # articleIdNew lookups are already served by the unique
+        # (articleIdNew, articleIdApproved) index, so only the metric
+        # columns need their own indexes for the IS NULL / = 1 scans.
+        # The partial id indexes hold only pending rows, so keyset batch
+        # fetches stay cheap once most pairs have been scored.
+        indexes = {
+            'idx_adr_urlcheck': ("ArticleDuplicateRatings", "(urlCheck)"),
+            'idx_adr_contenthash': ("ArticleDuplicateRatings", "(contentHash)"),
+            'idx_adr_emb_null': ("ArticleDuplicateRatings", "(id) WHERE embeddingSearch IS NULL"),
+            'idx_adr_hash_null': ("ArticleDuplicateRatings", "(id) WHERE contentHash IS NULL"),
+            'idx_aa_articleId': ("ArticleApproveds", "(articleId)"),
+        }
+
+        rows = self._conn.execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()
+        missing = set(indexes) - {row[0] for row in rows}
+        if not missing:
+            return
+
+        for name in sorted(missing):
+            table, definition = indexes[name]
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}{definition}")
+
+        # Refresh planner statistics once, right after the indexes are built
+        for table in sorted({indexes[name][0] for name in missing}):
+            self.analyze(table)
+
+    def _ensure_pair_unique_index(self):
+        """Make sure (articleIdNew, articleIdApproved) is unique so INSERT OR IGNORE skips existing pairs"""
+        for index in self._conn.execute("PRAGMA index_list(ArticleDuplicateRatings)").fetchall():
+            if not index['unique']:
+                continue
+            columns = [row['name'] for row in self._conn.execute(f"PRAGMA index_info({index['name']})")]
+            if columns == ['articleIdNew', 'articleIdApproved']:
+                return
+
+        try:
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_adr_pair ON ArticleDuplicateRatings(articleIdNew, articleIdApproved)"
+            )
+        except sqlite3.IntegrityError:
+            print("Warning: ArticleDuplicateRatings contains duplicate pairs; load cannot skip existing pairs")
 
     @contextmanager
     def get_connection(self):
-        """Get database connection with proper cleanup"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable column access by name
+        """Get the shared database connection wrapped in a transaction"""
+        conn = self._conn
+        if conn.in_transaction:
+            # Nested use joins the enclosing transaction
+            yield conn
+            return
+
+        conn.execute("BEGIN")
         try:
             yield conn
-            conn.commit()
+            conn.execute("COMMIT")
         except Exception:
-            conn.rollback()
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
             raise
-        finally:
-            conn.close()
+
+    def close(self):
+        """Refresh planner statistics and close the shared database connection"""
+        if self._conn is not None:
+            # SQLite's recommended idiom: cheap, only re-analyzes what changed
+            if not self.read_only:
+                try:
+                    self._conn.execute("PRAGMA optimize")
+                except sqlite3.Error:
+                    pass  # Stats refresh is best-effort; still close the connection
+            self._conn.close()
+            self._conn = None
+
+    def drop_rating_indexes(self) -> List[str]:
+        """
+        Drop the non-unique indexes on ArticleDuplicateRatings ahead of a bulk insert.
+
+        Unique indexes stay, since INSERT OR IGNORE relies on them to skip
+        existing pairs. Run inside the insert's transaction so a rollback
+        restores the dropped indexes.
+
+        Returns:
+            CREATE INDEX statements to pass to rebuild_rating_indexes
+        """
+        with self.get_connection() as conn:
+            unique = {row['name'] for row in conn.execute("PRAGMA index_list(ArticleDuplicateRatings)") if row['unique']}
+            rows = conn.execute(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = 'ArticleDuplicateRatings' AND sql IS NOT NULL"
+            ).fetchall()
+            dropped = [row for row in rows if row['name'] not in unique]
+            for row in dropped:
+                conn.execute(f'DROP INDEX "{row["name"]}"')
+        return [row['sql'] for row in dropped]
+
+    def rebuild_rating_indexes(self, index_sql: List[str]):
+        """Recreate indexes removed by drop_rating_indexes, one sorted build each"""
+        with self.get_connection() as conn:
+            for sql in index_sql:
+                conn.execute(sql)
+
+    def analyze(self, table: str = 'ArticleDuplicateRatings'):
+        """Rebuild planner statistics for a table (ArticleDuplicateRatings by default) after bulk changes"""
+        self._conn.execute(f"ANALYZE {table}")
 
     def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[sqlite3.Row]:
         """Execute a SELECT query and return results"""
@@ -56,147 +220,327 @@ class DatabaseManager:
                 cursor.execute(query)
             return cursor.fetchall()
 
-    def execute_update(self, query: str, params: Optional[Tuple] = None) -> int:
-        """Execute an UPDATE/INSERT/DELETE query and return affected rows"""
+    def execute_scalar(self, query: str, params: Optional[Tuple] = None) -> Any:
+        """Execute a single-value SELECT query and return that value"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            # Plain tuple rows; no sqlite3.Row needed for one value
+            cursor.row_factory = None
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
-            return cursor.rowcount
+            row = cursor.fetchone()
+            return row[0] if row else None
 
-    def execute_many(self, query: str, params_list: List[Tuple]) -> int:
-        """Execute query with multiple parameter sets"""
+    def execute_update(self, query: str, params: Optional[Tuple] = None) -> int:
+        """Execute an UPDATE/INSERT/DELETE query and return affected rows"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.executemany(query, params_list)
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
             return cursor.rowcount
 
-    def get_approved_article_ids(self) -> List[int]:
-        """Get all approved article IDs from ArticleApproveds table"""
+    def execute_many(self, query: str, params_list: Iterable[Tuple], transaction_size: int = 5000) -> int:
+        """
+        Execute query with multiple parameter sets, committing every transaction_size rows.
+
+        params_list may be any iterable, including a generator; it is streamed
+        into executemany without being materialized.
+        """
+        total = 0
+        params_iter = iter(params_list)
+        for first in params_iter:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(query, chain((first,), islice(params_iter, transaction_size - 1)))
+                total += cursor.rowcount
+        return total
+
+    def get_approved_article_ids(self) -> array:
+        """Get all approved article IDs from ArticleApproveds table, sorted and packed as array('q')"""
         query = """
         SELECT DISTINCT articleId
         FROM ArticleApproveds
+        WHERE articleId IS NOT NULL
         ORDER BY articleId
         """
-        rows = self.execute_query(query)
-        return [row['articleId'] for row in rows]
+        with self.get_connection() as conn:
+            return array('q', (row[0] for row in conn.execute(query)))
+
+    def get_all_article_ids(self) -> Set[int]:
+        """Get all article IDs from Articles table"""
+        with self.get_connection() as conn:
+            return {row[0] for row in conn.execute("SELECT id FROM Articles")}
 
     def get_duplicate_ratings_count(self) -> int:
         """Get count of rows in ArticleDuplicateRatings table"""
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings"
-        result = self.execute_query(query)
-        return result[0]['count']
+        query = "SELECT COUNT(*) FROM ArticleDuplicateRatings"
+        return self.execute_scalar(query)
 
     def get_duplicate_ratings_stats(self) -> Dict[str, int]:
         """Get statistics about ArticleDuplicateRatings table"""
-        stats = {}
-
-        # Total pairs
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings"
-        result = self.execute_query(query)
-        stats['total_pairs'] = result[0]['count']
-
-        # Unique new articles
-        query = "SELECT COUNT(DISTINCT articleIdNew) as count FROM ArticleDuplicateRatings"
-        result = self.execute_query(query)
-        stats['unique_new_articles'] = result[0]['count']
-
-        # Unique approved articles
-        query = "SELECT COUNT(DISTINCT articleIdApproved) as count FROM ArticleDuplicateRatings"
-        result = self.execute_query(query)
-        stats['unique_approved_articles'] = result[0]['count']
+        # All counts in a single pass over the table
+        query = """
+        SELECT
+            COUNT(*) as total_pairs,
+            COUNT(DISTINCT articleIdNew) as unique_new_articles,
+            COUNT(DISTINCT articleIdApproved) as unique_approved_articles
+        FROM ArticleDuplicateRatings
+        """
+        row = self.execute_query(query)[0]
 
-        return stats
+        return {
+            'total_pairs': row['total_pairs'],
+            'unique_new_articles': row['unique_new_articles'],
+            'unique_approved_articles': row['unique_approved_articles']
+        }
 
     def clear_duplicate_ratings(self) -> int:
         """Clear all data from ArticleDuplicateRatings table"""
         query = "DELETE FROM ArticleDuplicateRatings"
         return self.execute_update(query)
 
-    def insert_duplicate_ratings_batch(self, pairs: List[Tuple[int, int]]) -> int:
-        """Insert multiple article pairs into ArticleDuplicateRatings table"""
-        if not pairs:
-            return 0
+    def insert_duplicate_ratings_batch(self, pairs: Iterable[Tuple[int, int]]) -> int:
+        """
+        Insert multiple article pairs into ArticleDuplicateRatings table.
 
-        query = """
+        Full chunks of PAIRS_PER_INSERT pairs go through one multi-row
+        INSERT each; the remainder uses the single-row statement.
+        """
+        single_query = """
         INSERT OR IGNORE INTO ArticleDuplicateRatings
         (articleIdNew, articleIdApproved, createdAt, updatedAt)
-        VALUES (?, ?, datetime('now'), datetime('now'))
+        VALUES (?1, ?2, ?3, ?3)
+        """
+        # ?1 is the shared timestamp; each row binds its own pair after it
+        rows = ','.join(f"(?{2 * i + 2}, ?{2 * i + 3}, ?1, ?1)" for i in range(self.PAIRS_PER_INSERT))
+        multi_query = f"""
+        INSERT OR IGNORE INTO ArticleDuplicateRatings
+        (articleIdNew, articleIdApproved, createdAt, updatedAt)
+        VALUES {rows}
         """
 
-        return self.execute_many(query, pairs)
+        now = utc_timestamp()
+        pairs_iter = iter(pairs)
+        total = 0
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            while True:
+                chunk = list(islice(pairs_iter, self.PAIRS_PER_INSERT))
+                if len(chunk) == self.PAIRS_PER_INSERT:
+                    cursor.execute(multi_query, (now, *chain.from_iterable(chunk)))
+                    total += cursor.rowcount
+                    continue
+                if chunk:
+                    cursor.executemany(single_query, ((new_id, approved_id, now) for new_id, approved_id in chunk))
+                    total += cursor.rowcount
+                break
+        return total
 
     def check_article_exists(self, article_id: int) -> bool:
         """Check if article exists in Articles table"""
-        query = "SELECT 1 FROM Articles WHERE id = ? LIMIT 1"
-        result = self.execute_query(query, (article_id,))
-        return len(result) > 0
+        query = "SELECT EXISTS(SELECT 1 FROM Articles WHERE id = ? LIMIT 1)"
+        return bool(self.execute_scalar(query, (article_id,)))
+
+    def get_article_urls_for_url_check(self) -> List[sqlite3.Row]:
+        """Get id and url of every article referenced by a pair that needs URL checking (urlCheck is NULL)"""
+        query = """
+        SELECT id, url
+        FROM Articles
+        WHERE id IN (
+            SELECT articleIdNew FROM ArticleDuplicateRatings WHERE urlCheck IS NULL
+            UNION
+            SELECT articleIdApproved FROM ArticleDuplicateRatings WHERE urlCheck IS NULL
+        )
+        ORDER BY id
+        """
+        return self.execute_query(query)
+
+    def get_url_map(self, article_ids: Iterable[int]) -> Dict[int, str]:
+        """
+        Load the URL of each given article once.
+
+        Args:
+            article_ids: Article IDs, possibly repeated
+
+        Returns:
+            Mapping of articleId to url
+        """
+        ids = list(dict.fromkeys(article_ids))
+        urls: Dict[int, str] = {}
+        with self.get_connection() as conn:
+            for start in range(0, len(ids), self.IDS_PER_LOOKUP):
+                chunk = ids[start:start + self.IDS_PER_LOOKUP]
+                placeholders = ','.join('?' * len(chunk))
+                query = f"SELECT id, url FROM Articles WHERE id IN ({placeholders})"
+                urls.update(conn.execute(query, chunk))
+        return urls
+
+    def update_scores_batch(self, column: str, score_updates: Iterable[Tuple[float, int]]) -> int:
+        """
+        Set one metric column for many rating IDs with a single UPDATE.
 
-    def get_existing_pairs_count(self, new_article_ids: List[int]) -> int:
-        """Get count of existing pairs for the given new article IDs"""
-        if not new_article_ids:
-            return 0
+        Rows are staged in a temp table and applied with UPDATE ... FROM in
+        one transaction, so ArticleDuplicateRatings is written once per batch
+        instead of once per row.
+
+        Args:
+            column: One of SCORE_COLUMNS
+            score_updates: (score, rating_id) tuples
+
+        Returns:
+            Number of ArticleDuplicateRatings rows updated
+        """
+        if column not in self.SCORE_COLUMNS:
+            raise ValueError(f"Unknown score column: {column}")
 
-        placeholders = ','.join('?' * len(new_article_ids))
         query = f"""
-        SELECT COUNT(*) as count
-        FROM ArticleDuplicateRatings
-        WHERE articleIdNew IN ({placeholders})
+        UPDATE ArticleDuplicateRatings
+        SET {column} = ScoreUpdates.score, updatedAt = ?
+        FROM ScoreUpdates
+        WHERE ArticleDuplicateRatings.id = ScoreUpdates.id
         """
-        result = self.execute_query(query, new_article_ids)
-        return result[0]['count']
 
-    def get_articles_for_url_check(self, batch_size: int = 1000) -> List[sqlite3.Row]:
-        """Get article pairs that need URL checking (urlCheck is NULL)"""
-        query = """
-        SELECT
-            adr.id,
-            adr.articleIdNew,
-            adr.articleIdApproved,
-            a1.url as urlNew,
-            a2.url as urlApproved
-        FROM ArticleDuplicateRatings adr
-        JOIN Articles a1 ON a1.id = adr.articleIdNew
-        JOIN Articles a2 ON a2.id = adr.articleIdApproved
-        WHERE adr.urlCheck IS NULL
-        LIMIT ?
-        """
-        return self.execute_query(query, (batch_size,))
-
-    def update_url_check_batch(self, url_check_updates: List[Tuple[float, int]]) -> int:
-        """Update urlCheck values for multiple rating IDs"""
-        if not url_check_updates:
-            return 0
+        with self.get_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ScoreUpdates (id, score) VALUES (?, ?)",
+                ((rating_id, score) for score, rating_id in score_updates)
+            )
+            updated_count = conn.execute(query, (utc_timestamp(),)).rowcount
+            conn.execute("DELETE FROM ScoreUpdates")
 
-        query = """
+        return updated_count
+
+    def resolve_url_checks(self, canonical_urls: Iterable[Tuple[int, Optional[str]]], batch_size: int = 1000) -> Tuple[int, int]:
+        """
+        Set urlCheck for all pending pairs from per-article canonical URLs.
+
+        Each distinct canonical URL is interned to a small integer key and the
+        keys are staged in a temp table, so the join compares integers rather
+        than URL strings. Every pending pair is then scored by one
+        UPDATE ... FROM join: 1.0 when both articles have the same non-NULL
+        canonical URL, 0.0 otherwise.
+
+        Args:
+            canonical_urls: (article_id, canonical_url or None) tuples
+            batch_size: Rows staged per executemany call
+
+        Returns:
+            (pairs updated, pairs matching)
+        """
+        pending_condition = """
+        ArticleDuplicateRatings.urlCheck IS NULL
+          AND c1.id = ArticleDuplicateRatings.articleIdNew
+          AND c2.id = ArticleDuplicateRatings.articleIdApproved
+        """
+        count_query = f"""
+        SELECT COUNT(*)
+        FROM ArticleDuplicateRatings, ArticleCanon c1, ArticleCanon c2
+        WHERE {pending_condition} AND c1.canon = c2.canon
+        """
+        update_query = f"""
         UPDATE ArticleDuplicateRatings
-        SET urlCheck = ?, updatedAt = datetime('now')
-        WHERE id = ?
+        SET urlCheck = CASE WHEN c1.canon IS NOT NULL AND c1.canon = c2.canon THEN 1.0 ELSE 0.0 END,
+            updatedAt = ?
+        FROM ArticleCanon c1, ArticleCanon c2
+        WHERE {pending_condition}
         """
-        return self.execute_many(query, url_check_updates)
+
+        # Equal URLs get equal keys; unlike a hash, interning cannot collide
+        canon_keys: Dict[str, int] = {}
+        rows_iter = (
+            (article_id, None if canonical is None else canon_keys.setdefault(canonical, len(canon_keys)))
+            for article_id, canonical in canonical_urls
+        )
+
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM ArticleCanon")
+            for first in rows_iter:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO ArticleCanon (id, canon) VALUES (?, ?)",
+                    chain((first,), islice(rows_iter, batch_size - 1))
+                )
+            matches = conn.execute(count_query).fetchone()[0]
+            updated_count = conn.execute(update_query, (utc_timestamp(),)).rowcount
+            conn.execute("DELETE FROM ArticleCanon")
+
+        return updated_count, matches
 
     def get_url_check_stats(self) -> Dict[str, int]:
         """Get statistics about URL check progress"""
-        stats = {}
-
-        # Total pairs
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings"
-        result = self.execute_query(query)
-        stats['total_pairs'] = result[0]['count']
+        # All counts in a single pass over the table
+        query = """
+        SELECT
+            COUNT(*) as total_pairs,
+            COUNT(urlCheck) as url_check_completed,
+            COALESCE(SUM(urlCheck = 1), 0) as matching_urls
+        FROM ArticleDuplicateRatings
+        """
+        row = self.execute_query(query)[0]
 
-        # Pairs with URL check completed
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings WHERE urlCheck IS NOT NULL"
-        result = self.execute_query(query)
-        stats['url_check_completed'] = result[0]['count']
+        stats = {
+            'total_pairs': row['total_pairs'],
+            'url_check_completed': row['url_check_completed']
+        }
 
         # Pairs pending URL check
         stats['url_check_pending'] = stats['total_pairs'] - stats['url_check_completed']
 
         # Matching URLs (urlCheck = 1)
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings WHERE urlCheck = 1"
-        result = self.execute_query(query)
-        stats['matching_urls'] = result[0]['count']
+        stats['matching_urls'] = row['matching_urls']
 
-        return stats
\ No newline at end of file
+        return stats
+
+    def get_content_hash_stats(self) -> Dict[str, Any]:
+        """Get statistics about content hash progress in a single table scan"""
+        query = """
+        SELECT
+            COUNT(*) AS total,
+            COUNT(contentHash) AS done,
+            COALESCE(SUM(contentHash = 1), 0) AS matching
+        FROM ArticleDuplicateRatings
+        """
+        row = self.execute_query(query)[0]
+
+        return {
+            'total_pairs': row['total'],
+            'content_hash_completed': row['done'],
+            'content_hash_pending': row['total'] - row['done'],
+            'matching_content': row['matching']
+        }
+
+    def get_embedding_search_stats(self) -> Dict[str, Any]:
+        """Get statistics about embedding search progress in a single table scan"""
+        query = """
+        SELECT
+            COUNT(*) AS total,
+            COUNT(embeddingSearch) AS done,
+            AVG(embeddingSearch) AS avg,
+            COALESCE(SUM(embeddingSearch > 0.8), 0) AS high
+        FROM ArticleDuplicateRatings
+        """
+        row = self.execute_query(query)[0]
+
+        # Pairs the lexical prefilter kept from the model stay pending; the
+        # table only exists once embeddingsearch has run
+        prefiltered = 0
+        if self.execute_query("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ArticleEmbeddingPrefilter'"):
+            prefiltered_query = """
+            SELECT COUNT(*) AS count
+            FROM ArticleEmbeddingPrefilter p
+            JOIN ArticleDuplicateRatings adr ON adr.id = p.ratingId
+            WHERE adr.embeddingSearch IS NULL
+            """
+            prefiltered = self.execute_query(prefiltered_query)[0]['count']
+
+        return {
+            'total_pairs': row['total'],
+            'embedding_search_completed': row['done'],
+            'embedding_search_pending': row['total'] - row['done'],
+            'embedding_search_prefiltered': prefiltered,
+            'high_similarity_pairs': row['high'],
+            'avg_similarity_score': float(row['avg']) if row['avg'] else 0.0
+        }
@@ -11,13 +11,12 @@ import sys
 from pathlib import Path
 
 from config import Config
-from services.pair_indexer import PairIndexer
-from services.urlcheck import URLCheckService
-from metrics.text_hash import ContentHashProcessor
-from metrics.embeddings import EmbeddingProcessor
 from db import DatabaseManager
 from utils.timing import timer
 
+# Service and metric modules are imported inside the command branches that
+# use them, so light commands like `status` skip numpy/sentence-transformers.
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -29,7 +28,6 @@ def main():
     # Load command
     load_parser = subparsers.add_parser('load', help='Load article IDs from CSV and create pairs')
     load_parser.add_argument('--csv-path', type=str, help='Path to CSV file (overrides config)')
-    load_parser.add_argument('--force', action='store_true', help='Force reload even if pairs exist')
 
     # Reset command
     reset_parser = subparsers.add_parser('reset', help='Clear ArticleDuplicateRatings table')
@@ -40,7 +38,7 @@ def main():
 
     # URL Check command
     urlcheck_parser = subparsers.add_parser('urlcheck', help='Compute URL similarity scores')
-    urlcheck_parser.add_argument('--batch-size', type=int, default=1000, help='Batch size for processing (default: 1000)')
+    urlcheck_parser.add_argument('--batch-size', type=int, default=1000, help='Canonical URLs staged per batch (default: 1000)')
     urlcheck_parser.add_argument('--force', action='store_true', help='Recompute all URL scores, even existing ones')
 
     # Content Hash command
@@ -52,6 +50,10 @@ def main():
     embeddingsearch_parser.add_argument('--force', action='store_true', help='Recompute all embedding scores, even existing ones')
     embeddingsearch_parser.add_argument('--model', type=str, default='all-MiniLM-L6-v2', help='Sentence transformer model name (default: all-MiniLM-L6-v2)')
     embeddingsearch_parser.add_argument('--batch-size', type=int, default=500, help='Batch size for processing (default: 500)')
+    embeddingsearch_parser.add_argument('--backend', type=str, choices=['torch', 'onnx', 'openvino'], default='torch', help='Model inference backend; onnx/openvino are faster on CPU (default: torch)')
+    embeddingsearch_parser.add_argument('--model-file', type=str, help='Model file within the repo for the chosen backend, e.g. onnx/model_qint8_avx512.onnx')
+    embeddingsearch_parser.add_argument('--workers', type=int, help='CPU processes used to encode embeddings (default: EMBED_WORKERS or 1, which disables the pool)')
+    embeddingsearch_parser.add_argument('--prefilter-threshold', type=float, default=0.0, help='Skip the model for pairs whose lexical similarity is below this; they keep embeddingSearch NULL and their score goes to ArticleEmbeddingPrefilter (default: 0, disabled)')
 
     args = parser.parse_args()
 
@@ -61,17 +63,20 @@ def main():
 
     try:
         config = Config()
-        pair_indexer = PairIndexer(config)
-        db_manager = DatabaseManager(config)
+        # status only reads, so it never creates indexes or tables on the shared database
+        db_manager = DatabaseManager(config, read_only=args.command == 'status')
 
         if args.command == 'load':
+            from services.pair_indexer import PairIndexer
+            pair_indexer = PairIndexer(config)
+
             csv_path = args.csv_path or config.PATH_TO_CSV
             if not csv_path or not Path(csv_path).exists():
                 print(f"Error: CSV file not found: {csv_path}")
                 return 1
 
             with timer("Loading article pairs"):
-                result = pair_indexer.create_pairs_from_csv(csv_path, force=args.force)
+                result = pair_indexer.create_pairs_from_csv(csv_path)
                 print(f"Created {result['new_pairs']} new pairs")
                 print(f"Skipped {result['existing_pairs']} existing pairs")
                 print(f"Total pairs in database: {result['total_pairs']}")
@@ -82,11 +87,18 @@ def main():
                 print("Use --confirm flag to proceed")
                 return 1
 
+            from services.pair_indexer import PairIndexer
+            pair_indexer = PairIndexer(config)
+
             with timer("Resetting ArticleDuplicateRatings table"):
                 deleted_count = pair_indexer.reset_ratings_table()
                 print(f"Deleted {deleted_count} rows from ArticleDuplicateRatings")
 
         elif args.command == 'status':
+            from services.pair_indexer import PairIndexer
+            from services.urlcheck import URLCheckService
+
+            pair_indexer = PairIndexer(config, read_only=True)
             status = pair_indexer.get_status()
             print(f"ArticleDuplicateRatings rows: {status['total_pairs']}")
             print(f"Unique new articles: {status['unique_new_articles']}")
@@ -94,32 +106,31 @@ def main():
             print(f"Articles from CSV loaded: {status['csv_articles_loaded']}")
 
             # Add URL check status
-            url_service = URLCheckService(config)
+            url_service = URLCheckService(config, read_only=True)
             url_status = url_service.get_url_check_status()
             print(f"URL check completed: {url_status['url_check_completed']} ({url_status['completion_percentage']}%)")
             print(f"URL matches found: {url_status['matching_urls']} ({url_status['match_percentage']}%)")
 
             # Add content hash status
-            content_processor = ContentHashProcessor(db_manager)
-            content_stats = content_processor.get_content_hash_stats()
+            content_stats = db_manager.get_content_hash_stats()
             completion_pct = (content_stats['content_hash_completed'] * 100) // content_stats['total_pairs'] if content_stats['total_pairs'] > 0 else 0
             match_pct = (content_stats['matching_content'] * 100) // content_stats['content_hash_completed'] if content_stats['content_hash_completed'] > 0 else 0
             print(f"Content hash completed: {content_stats['content_hash_completed']} ({completion_pct}%)")
             print(f"Content matches found: {content_stats['matching_content']} ({match_pct}%)")
 
-            # Add embedding search status
-            try:
-                embedding_processor = EmbeddingProcessor(db_manager)
-                embedding_stats = embedding_processor.get_embedding_search_stats()
-                embedding_completion_pct = (embedding_stats['embedding_search_completed'] * 100) // embedding_stats['total_pairs'] if embedding_stats['total_pairs'] > 0 else 0
-                avg_score = embedding_stats['avg_similarity_score']
-                print(f"Embedding search completed: {embedding_stats['embedding_search_completed']} ({embedding_completion_pct}%)")
-                print(f"High similarity pairs (>0.8): {embedding_stats['high_similarity_pairs']}")
-                print(f"Average similarity score: {avg_score:.3f}")
-            except ImportError:
-                print("Embedding search: Not available (sentence-transformers not installed)")
+            # Add embedding search status; read straight from the database so
+            # status never imports the embedding stack
+            embedding_stats = db_manager.get_embedding_search_stats()
+            embedding_completion_pct = (embedding_stats['embedding_search_completed'] * 100) // embedding_stats['total_pairs'] if embedding_stats['total_pairs'] > 0 else 0
+            avg_score = embedding_stats['avg_similarity_score']
+            print(f"Embedding search completed: {embedding_stats['embedding_search_completed']} ({embedding_completion_pct}%)")
+            print(f"High similarity pairs (>0.8): {embedding_stats['high_similarity_pairs']}")
+            if embedding_stats['embedding_search_prefiltered'] > 0:
+                print(f"Embedding search prefiltered (model skipped): {embedding_stats['embedding_search_prefiltered']}")
+            print(f"Average similarity score: {avg_score:.3f}")
 
         elif args.command == 'urlcheck':
+            from services.urlcheck import URLCheckService
             url_service = URLCheckService(config)
 
             with timer("Computing URL similarity scores"):
@@ -131,6 +142,7 @@ def main():
                 print(f"Found {result['url_matches_found']} URL matches ({result['match_rate']}% match rate)")
 
         elif args.command == 'contenthash':
+            from metrics.text_hash import ContentHashProcessor
             content_processor = ContentHashProcessor(db_manager)
 
             if args.force:
@@ -138,30 +150,31 @@ def main():
                 with timer("Resetting content hash values"):
                     reset_query = "UPDATE ArticleDuplicateRatings SET contentHash = NULL WHERE contentHash IS NOT NULL"
                     reset_count = db_manager.execute_update(reset_query)
+                    # Article text may have changed, so rehash every article
+                    content_processor.clear_content_hashes()
                     print(f"Reset {reset_count} existing content hash values for recomputation")
 
-            # Process all pending content hash computations
-            total_processed = 0
-            total_matches = 0
-
+            # Hash each referenced article once, then score all pending pairs in SQL
             with timer("Computing content hash similarity scores"):
-                while True:
-                    batch_result = content_processor.process_content_hash_batch(batch_size=1000)
-
-                    if batch_result['processed'] == 0:
-                        break
-
-                    total_processed += batch_result['processed']
-                    total_matches += batch_result['matches']
-
-                    print(f"Batch: {batch_result['processed']} processed, {batch_result['matches']} matches, {batch_result['errors']} errors")
+                result = content_processor.process_content_hash()
+                total_processed = result['processed']
+                total_matches = result['matches']
 
+                print(f"Hashed {result['articles_hashed']} articles, {result['errors']} errors")
                 print(f"Total processed: {total_processed} pairs")
                 print(f"Total matches found: {total_matches} ({(total_matches * 100) // total_processed if total_processed > 0 else 0}% match rate)")
 
         elif args.command == 'embeddingsearch':
             try:
-                embedding_processor = EmbeddingProcessor(db_manager, model_name=args.model)
+                from metrics.embeddings import EmbeddingProcessor
+                embedding_processor = EmbeddingProcessor(
+                    db_manager,
+                    model_name=args.model,
+                    prefilter_threshold=args.prefilter_threshold,
+                    backend=args.backend,
+                    model_file=args.model_file,
+                    workers=args.workers
+                )
             except ImportError as e:
                 print(f"Error: {e}", file=sys.stderr)
                 return 1
@@ -172,11 +185,17 @@ def main():
                     reset_query = "UPDATE ArticleDuplicateRatings SET embeddingSearch = NULL WHERE embeddingSearch IS NOT NULL"
                     reset_count = db_manager.execute_update(reset_query)
                     print(f"Reset {reset_count} existing embedding search values for recomputation")
+                    embedding_processor.clear_embedding_store()
+                    print(f"Cleared stored embeddings in {embedding_processor.store_dir}")
+                    embedding_processor.clear_prefilter_scores()
 
             # Process all pending embedding search computations with progress bars
             with timer("Computing embedding similarity scores"):
                 result = embedding_processor.process_all_embedding_search(batch_size=args.batch_size)
 
+                if result['total_resolved_by_hash'] > 0:
+                    print(f"Pairs resolved by content hash match (score 1.0): {result['total_resolved_by_hash']}")
+
                 if result['total_processed'] == 0:
                     print("No pending embedding computations found")
                 else:
@@ -185,6 +204,8 @@ def main():
                     print(f"Average similarity score: {result['overall_avg_similarity']:.3f}")
                     print(f"Batches completed: {result['batches_completed']}")
                     print(f"Final embedding cache size: {result['final_cache_size']} unique articles")
+                    if result['total_prefiltered'] > 0:
+                        print(f"Pairs prefiltered (model skipped, embeddingSearch left NULL): {result['total_prefiltered']}")
                     if result['total_errors'] > 0:
                         print(f"Errors encountered: {result['total_errors']}")
 
@@ -0,0 +1,196 @@
+"""
+On-disk embedding store for NewsNexus Deduper
+
+Keeps article embeddings in a memory-mapped float16 matrix indexed by
+articleId so later runs reuse earlier model work instead of re-encoding.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """
+    Memory-mapped embedding matrix with a per-row version array.
+
+    Row i of embeddings.fp16 holds the embedding for articleId i; row i is
+    valid only when versions[i] is nonzero, and only for the article text
+    version (its updatedAt) it was encoded from. The file grows as larger
+    article IDs are written.
+    """
+
+    DTYPE = np.float16
+    EMBEDDINGS_FILE = 'embeddings.fp16'
+    VERSIONS_FILE = 'embeddings_version.npy'
+    METADATA_FILE = 'store.json'
+    # Bumped when the on-disk layout changes, so older stores are discarded
+    FORMAT = 2
+
+    def __init__(self, directory: Path, dimension: int, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Open (or create) the store in directory.
+
+        Args:
+            directory: Store directory
+            dimension: Embedding width
+            metadata: What produced the embeddings (model, backend, model file);
+                a store written under different metadata is discarded
+        """
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.metadata = {**(metadata or {}), 'dimension': dimension, 'dtype': np.dtype(self.DTYPE).name,
+                         'format': self.FORMAT}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._embeddings_path = self.directory / self.EMBEDDINGS_FILE
+        self._versions_path = self.directory / self.VERSIONS_FILE
+        self._metadata_path = self.directory / self.METADATA_FILE
+
+        self._matrix: Optional[np.memmap] = None
+        self._versions = np.zeros(0, dtype=np.int64)
+        self._dirty = False
+
+        # Vectors from another model, backend or export must never be mixed in
+        if self._read_metadata() != self.metadata:
+            if self._embeddings_path.exists():
+                logger.warning(f"Embedding store was written by a different model configuration, starting empty: {self.directory}")
+            self.clear()
+
+        row_bytes = self.dimension * np.dtype(self.DTYPE).itemsize
+        if self._embeddings_path.exists() and self._versions_path.exists():
+            rows = self._embeddings_path.stat().st_size // row_bytes
+            versions = self._load_versions()
+            if versions is None:
+                pass  # Already warned; start empty
+            elif len(versions) <= rows:
+                self._versions = np.zeros(rows, dtype=np.int64)
+                self._versions[:len(versions)] = versions
+                self._open(rows)
+                logger.info(f"Opened embedding store with {int(np.count_nonzero(versions))} embeddings: {self.directory}")
+            else:
+                logger.warning(f"Embedding store versions do not match its data file, starting empty: {self.directory}")
+
+    @staticmethod
+    def version_key(updated_at: Optional[str]) -> int:
+        """
+        Map an article's updatedAt to the nonzero 64-bit key stored for its row.
+
+        Args:
+            updated_at: The article's updatedAt as read from the database
+
+        Returns:
+            A positive integer that changes whenever updated_at does
+        """
+        digest = hashlib.blake2b(str(updated_at).encode('utf-8'), digest_size=8).digest()
+        return (int.from_bytes(digest, 'little') >> 1) | 1
+
+    def _read_metadata(self) -> Optional[Dict[str, Any]]:
+        """Read the stored metadata, or None if it is missing or unreadable"""
+        try:
+            with open(self._metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return metadata if isinstance(metadata, dict) else None
+
+    def _write_metadata(self):
+        """Record what produced this store's embeddings"""
+        tmp_path = self._metadata_path.with_name(f"{self._metadata_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.metadata, f, indent=2)
+        os.replace(tmp_path, self._metadata_path)
+
+    def _load_versions(self) -> Optional[np.ndarray]:
+        """Read the version array, or return None (with a warning) if it is damaged"""
+        try:
+            versions = np.load(self._versions_path)
+        except (OSError, ValueError, EOFError) as e:
+            logger.warning(f"Embedding store versions are unreadable ({e}), starting empty: {self.directory}")
+            return None
+        if versions.dtype != np.int64 or versions.ndim != 1:
+            logger.warning(f"Embedding store versions have an unexpected format, starting empty: {self.directory}")
+            return None
+        return versions
+
+    def _open(self, rows: int):
+        """Map the embeddings file with the given number of rows"""
+        self._matrix = np.memmap(self._embeddings_path, dtype=self.DTYPE, mode='r+', shape=(rows, self.dimension))
+
+    def _ensure_capacity(self, max_article_id: int):
+        """Grow the backing file so max_article_id has a row"""
+        rows = len(self._versions)
+        if max_article_id < rows:
+            return
+
+        # Grow geometrically so a stream of increasing IDs does not remap every batch
+        new_rows = max(max_article_id + 1, rows + rows // 2)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        with open(self._embeddings_path, 'ab') as f:
+            f.truncate(new_rows * self.dimension * np.dtype(self.DTYPE).itemsize)
+        self._versions = np.concatenate([self._versions, np.zeros(new_rows - rows, dtype=np.int64)])
+        self._open(new_rows)
+
+    def __contains__(self, article_id: int) -> bool:
+        return 0 <= article_id < len(self._versions) and bool(self._versions[article_id])
+
+    def get(self, article_id: int, updated_at: Optional[str]) -> Optional[np.ndarray]:
+        """
+        Return a copy of the stored embedding, or None if it is missing or stale.
+
+        Args:
+            article_id: Article ID
+            updated_at: The article's current updatedAt; an embedding encoded
+                from an earlier version of the article is treated as missing
+        """
+        if article_id not in self or self._versions[article_id] != self.version_key(updated_at):
+            return None
+        return np.array(self._matrix[article_id])
+
+    def put_many(self, article_ids: Sequence[int], embeddings: np.ndarray, updated_ats: Sequence[Optional[str]]):
+        """
+        Store embeddings for several articles.
+
+        Args:
+            article_ids: Article IDs, one per row of embeddings
+            embeddings: Matrix of shape (len(article_ids), dimension)
+            updated_ats: Each article's updatedAt when its text was read
+        """
+        if not len(article_ids):
+            return
+        ids = np.asarray(article_ids, dtype=np.int64)
+        self._ensure_capacity(int(ids.max()))
+        self._matrix[ids] = embeddings
+        self._versions[ids] = [self.version_key(updated_at) for updated_at in updated_ats]
+        self._dirty = True
+
+    def flush(self):
+        """Write pending rows, then the versions, so a set version always has its data on disk"""
+        if not self._dirty:
+            return
+        self._matrix.flush()
+        # Written beside the version file and renamed over it, so an interrupted
+        # flush leaves the previous versions rather than a truncated file
+        tmp_path = self._versions_path.with_name(f"{self._versions_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, self._versions)
+        os.replace(tmp_path, self._versions_path)
+        self._dirty = False
+
+    def clear(self):
+        """Delete every stored embedding"""
+        self._matrix = None
+        self._versions = np.zeros(0, dtype=np.int64)
+        self._dirty = False
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._write_metadata()
@@ -9,18 +9,39 @@ even when using different words.
 import numpy as np
 from typing import Optional, List, Tuple, Dict
 import logging
+import re
+import zlib
+from pathlib import Path
 from tqdm import tqdm
 
 try:
+    import sentence_transformers
     from sentence_transformers import SentenceTransformer
     SENTENCE_TRANSFORMERS_AVAILABLE = True
 except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
 
-from db import DatabaseManager
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+
+from db import DatabaseManager, utc_timestamp
+from utils.lru import LRUCache
+from metrics.embedding_store import EmbeddingStore
 
 logger = logging.getLogger(__name__)
 
+# Cached embeddings are unit-normalized and stored at half precision: half the
+# memory of float32, and well within the precision needed for a 0-1 score
+EMBEDDING_DTYPE = np.float16
+
+# Width of the hashed bag-of-words vectors used by the optional prefilter
+PREFILTER_FEATURES = 1024
+
+_TOKEN_RE = re.compile(r'\w+')
+
 
 def combine_article_text(headline: Optional[str], text: Optional[str]) -> str:
     """
@@ -48,37 +69,125 @@ def combine_article_text(headline: Optional[str], text: Optional[str]) -> str:
 
 def compute_cosine_similarity(embedding1: np.ndarray, embedding2: np.ndarray) -> float:
     """
-    Compute cosine similarity between two embeddings.
+    Compute cosine similarity between two unit-normalized embeddings.
+
+    Embeddings produced by EmbeddingProcessor are normalized at encode time,
+    so the cosine is just the dot product. Zero vectors (empty text) give 0.
 
     Args:
-        embedding1: First embedding vector
-        embedding2: Second embedding vector
+        embedding1: First embedding vector (unit length or zero)
+        embedding2: Second embedding vector (unit length or zero)
 
     Returns:
         Cosine similarity score between 0 and 1
     """
-    # Normalize vectors
-    norm1 = np.linalg.norm(embedding1)
-    norm2 = np.linalg.norm(embedding2)
-
-    if norm1 == 0 or norm2 == 0:
-        return 0.0
-
-    # Compute cosine similarity
-    similarity = np.dot(embedding1, embedding2) / (norm1 * norm2)
+    if SIMSIMD_AVAILABLE and embedding1.dtype == embedding2.dtype:
+        # SIMD kernel (AVX-512/NEON), handles float16 natively
+        similarity = simsimd.inner(np.ascontiguousarray(embedding1), np.ascontiguousarray(embedding2))
+    else:
+        # Accumulate in float32 so half-precision inputs do not lose accuracy
+        similarity = np.dot(embedding1.astype(np.float32), embedding2.astype(np.float32))
 
     # Clamp to [0, 1] range (cosine similarity is [-1, 1], but we want [0, 1])
     return max(0.0, float(similarity))
 
 
+def compute_pairwise_similarities(embeddings1: np.ndarray, embeddings2: np.ndarray) -> np.ndarray:
+    """
+    Compute row-wise cosine similarities between two stacks of unit-normalized embeddings.
+
+    Args:
+        embeddings1: Array of shape (n, d)
+        embeddings2: Array of shape (n, d)
+
+    Returns:
+        Array of n similarity scores clamped to [0, 1]
+    """
+    if SIMSIMD_AVAILABLE and embeddings1.dtype == embeddings2.dtype:
+        similarities = np.asarray(simsimd.inner(
+            np.ascontiguousarray(embeddings1),
+            np.ascontiguousarray(embeddings2)
+        ))
+    else:
+        similarities = np.einsum('ij,ij->i', embeddings1.astype(np.float32), embeddings2.astype(np.float32))
+
+    return np.clip(similarities, 0.0, 1.0)
+
+
+def compute_hashed_token_vector(text: str, n_features: int = PREFILTER_FEATURES) -> np.ndarray:
+    """
+    Compute a unit-normalized hashed bag-of-words vector for text.
+
+    This is a cheap lexical stand-in for an embedding: pairs whose vectors
+    barely overlap are very unlikely to be semantic duplicates.
+
+    Args:
+        text: Text to vectorize
+        n_features: Number of hash buckets
+
+    Returns:
+        float32 vector of length n_features (all zeros for empty text)
+    """
+    buckets = [zlib.crc32(token.encode('utf-8')) % n_features for token in _TOKEN_RE.findall(text.lower())]
+    vector = np.bincount(buckets, minlength=n_features).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
 class EmbeddingProcessor:
     """Processes embedding-based similarity metrics for article pairs"""
 
-    def __init__(self, db_manager: DatabaseManager, model_name: str = "all-MiniLM-L6-v2"):
+    # Mini-batch size passed to the model when encoding many texts at once
+    ENCODE_BATCH_SIZE = 64
+
+    # Article IDs per IN (...) query, below SQLite's host parameter limit
+    TEXT_QUERY_CHUNK = 500
+
+    # Hashed bag-of-words vectors kept for the prefilter, stored as float16
+    # (2 KB each, so about 40 MB at most); they are cheap to recompute, so
+    # this is bounded far below the embedding cache
+    PREFILTER_CACHE_SIZE = 20000
+
+    # Oldest sentence-transformers major version the encoding pool supports
+    MIN_POOL_ST_MAJOR = 3
+
+    # Inference backends supported by sentence-transformers >= 3.2
+    BACKENDS = ('torch', 'onnx', 'openvino')
+
+    def __init__(self, db_manager: DatabaseManager, model_name: str = "all-MiniLM-L6-v2",
+                 cache_size: Optional[int] = None, prefilter_threshold: float = 0.0,
+                 backend: str = "torch", model_file: Optional[str] = None,
+                 workers: Optional[int] = None, store_dir: Optional[Path] = None):
         self.db = db_manager
         self.model_name = model_name
         self.model = None
-        self.embedding_cache = {}  # Cache embeddings by articleId
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}', expected one of {self.BACKENDS}")
+        # ONNX Runtime / OpenVINO run the transformer 2-4x faster than torch on CPU;
+        # model_file picks a specific export such as 'onnx/model_qint8_avx512.onnx'
+        self.backend = backend
+        self.model_file = model_file
+        # Cache embeddings by articleId, bounded so long runs keep a fixed footprint
+        cache_size = cache_size or db_manager.config.EMBED_CACHE_SIZE
+        self.embedding_cache = LRUCache(cache_size)
+        # Pairs whose lexical prefilter score is below this skip the model; their
+        # score goes to ArticleEmbeddingPrefilter, never embeddingSearch. 0 disables it
+        self.prefilter_threshold = prefilter_threshold
+        self.prefilter_cache = LRUCache(min(cache_size, self.PREFILTER_CACHE_SIZE))
+        self._prefilter_table_ready = False
+        # Keyset pagination position across process_embedding_search_batch calls
+        self._last_processed_id = 0
+        # Encoding is sharded across this many processes during full runs
+        self.workers = workers or db_manager.config.EMBED_WORKERS
+        self._pool = None
+        # Embeddings persist across runs in an on-disk store, one per model
+        store_root = Path(store_dir or db_manager.config.EMBED_STORE_DIR)
+        # Keyed by model, backend and export so their vectors are never mixed
+        store_key = f"{model_name.replace('/', '__')}__{backend}"
+        if model_file:
+            store_key += f"__{Path(model_file).stem}"
+        self.store_dir = store_root / store_key
+        self.store: Optional[EmbeddingStore] = None
 
         if not SENTENCE_TRANSFORMERS_AVAILABLE:
             raise ImportError(
@@ -86,88 +195,315 @@ class EmbeddingProcessor:
                 "Install with: pip install sentence-transformers"
             )
 
+    def _ensure_prefilter_table(self):
+        """
+        Create the table holding lexical prefilter scores, on first use.
+
+        Prefiltered pairs keep embeddingSearch NULL so it only ever holds model
+        similarities; a later run with a lower (or no) threshold scores them.
+        """
+        if self._prefilter_table_ready:
+            return
+        query = """
+        CREATE TABLE IF NOT EXISTS ArticleEmbeddingPrefilter (
+            ratingId INTEGER PRIMARY KEY,
+            score REAL NOT NULL
+        )
+        """
+        self.db.execute_update(query)
+        self._prefilter_table_ready = True
+
+    def clear_prefilter_scores(self) -> int:
+        """Forget recorded prefilter scores so every pending pair is scored again"""
+        self._ensure_prefilter_table()
+        return self.db.execute_update("DELETE FROM ArticleEmbeddingPrefilter")
+
     def _load_model(self):
         """Lazy load the embedding model"""
         if self.model is None:
-            logger.info(f"Loading embedding model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
+            logger.info(f"Loading embedding model: {self.model_name} ({self.backend} backend)")
+            if self.backend == 'torch' and not self.model_file:
+                self.model = SentenceTransformer(self.model_name)
+            else:
+                model_kwargs = {'file_name': self.model_file} if self.model_file else None
+                self.model = SentenceTransformer(self.model_name, backend=self.backend, model_kwargs=model_kwargs)
             logger.info("Embedding model loaded successfully")
+            self.store = EmbeddingStore(
+                self.store_dir,
+                self.model.get_sentence_embedding_dimension(),
+                {'model': self.model_name, 'backend': self.backend, 'model_file': self.model_file}
+            )
 
-    def get_articles_for_embedding_search(self, batch_size: int = 1000) -> List:
-        """Get article pairs that need embedding search (embeddingSearch is NULL)"""
+    def clear_embedding_store(self):
+        """Delete persisted embeddings so every article is re-encoded from its current text"""
+        self._load_model()
+        self.store.clear()
+
+    def get_articles_for_embedding_search(self, batch_size: int = 1000, after_id: int = 0) -> List:
+        """
+        Get article pairs that need embedding search (embeddingSearch is NULL).
+
+        Pages by primary key: pass the last id of the previous batch as
+        after_id so already-processed rows are never rescanned. Pairs already
+        prefiltered below the current threshold are skipped. Only ids and
+        each article's updatedAt (which versions stored embeddings) are
+        returned; article text is loaded per article by get_article_texts.
+        """
         query = """
         SELECT
             adr.id,
             adr.articleIdNew,
             adr.articleIdApproved,
-            aa1.headlineForPdfReport as headlineNew,
-            aa1.textForPdfReport as textNew,
-            aa2.headlineForPdfReport as headlineApproved,
-            aa2.textForPdfReport as textApproved
+            aa1.updatedAt AS updatedAtNew,
+            aa2.updatedAt AS updatedAtApproved
         FROM ArticleDuplicateRatings adr
         JOIN ArticleApproveds aa1 ON aa1.articleId = adr.articleIdNew
         JOIN ArticleApproveds aa2 ON aa2.articleId = adr.articleIdApproved
         WHERE adr.embeddingSearch IS NULL
+          AND (adr.contentHash IS NULL OR adr.contentHash < 1.0)
+          AND adr.id > ?
+          AND NOT EXISTS (
+              SELECT 1 FROM ArticleEmbeddingPrefilter p
+              WHERE p.ratingId = adr.id AND p.score < ?
+          )
+        ORDER BY adr.id
         LIMIT ?
         """
-        return self.db.execute_query(query, (batch_size,))
+        self._ensure_prefilter_table()
+        return self.db.execute_query(query, (after_id, self.prefilter_threshold, batch_size))
 
-    def get_embedding_search_stats(self) -> dict:
-        """Get statistics about embedding search progress"""
-        stats = {}
+    def count_prefiltered_pending(self) -> int:
+        """Count pending pairs that the current threshold leaves prefiltered"""
+        query = """
+        SELECT COUNT(*) AS count
+        FROM ArticleEmbeddingPrefilter p
+        JOIN ArticleDuplicateRatings adr ON adr.id = p.ratingId
+        WHERE adr.embeddingSearch IS NULL AND p.score < ?
+        """
+        self._ensure_prefilter_table()
+        return self.db.execute_query(query, (self.prefilter_threshold,))[0]['count']
 
-        # Total pairs
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings"
-        result = self.db.execute_query(query)
-        stats['total_pairs'] = result[0]['count']
+    def get_article_texts(self, article_ids: List[int]) -> Dict[int, str]:
+        """
+        Load combined headline and text for the given articles.
 
-        # Pairs with embedding search completed
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings WHERE embeddingSearch IS NOT NULL"
-        result = self.db.execute_query(query)
-        stats['embedding_search_completed'] = result[0]['count']
+        Text is read and combined once per article rather than once per pair,
+        since each article appears in many pairs.
 
-        # Pairs pending embedding search
-        stats['embedding_search_pending'] = stats['total_pairs'] - stats['embedding_search_completed']
+        Args:
+            article_ids: Article IDs to load
 
-        # High similarity pairs (embeddingSearch > 0.8)
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings WHERE embeddingSearch > 0.8"
-        result = self.db.execute_query(query)
-        stats['high_similarity_pairs'] = result[0]['count']
+        Returns:
+            Mapping of articleId to combined text
+        """
+        texts: Dict[int, str] = {}
+        for start in range(0, len(article_ids), self.TEXT_QUERY_CHUNK):
+            chunk = article_ids[start:start + self.TEXT_QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            query = f"""
+            SELECT articleId, headlineForPdfReport, textForPdfReport
+            FROM ArticleApproveds
+            WHERE articleId IN ({placeholders})
+            """
+            for row in self.db.execute_query(query, tuple(chunk)):
+                texts[row['articleId']] = combine_article_text(row['headlineForPdfReport'], row['textForPdfReport'])
+        return texts
+
+    def resolve_content_hash_matches(self) -> int:
+        """
+        Set embeddingSearch to 1.0 for pending pairs whose content hashes match.
 
-        # Average similarity score
-        query = "SELECT AVG(embeddingSearch) as avg_score FROM ArticleDuplicateRatings WHERE embeddingSearch IS NOT NULL"
-        result = self.db.execute_query(query)
-        stats['avg_similarity_score'] = float(result[0]['avg_score']) if result[0]['avg_score'] else 0.0
+        Identical normalized content needs no model call; run contenthash
+        before embeddingsearch so these pairs are known.
 
-        return stats
+        Returns:
+            Number of pairs resolved
+        """
+        query = """
+        UPDATE ArticleDuplicateRatings
+        SET embeddingSearch = 1.0, updatedAt = ?
+        WHERE contentHash = 1.0 AND embeddingSearch IS NULL
+        """
+        return self.db.execute_update(query, (utc_timestamp(),))
+
+    def get_embedding_search_stats(self) -> dict:
+        """Get statistics about embedding search progress"""
+        return self.db.get_embedding_search_stats()
 
     def update_embedding_search_batch(self, embedding_updates: List[Tuple[float, int]]) -> int:
         """Update embeddingSearch values for multiple rating IDs"""
         if not embedding_updates:
             return 0
 
-        query = """
-        UPDATE ArticleDuplicateRatings
-        SET embeddingSearch = ?, updatedAt = datetime('now')
-        WHERE id = ?
+        return self.db.update_scores_batch('embeddingSearch', embedding_updates)
+
+    def record_prefilter_scores(self, prefilter_updates: List[Tuple[float, int]]) -> int:
+        """Record lexical prefilter scores for pairs that skipped the model"""
+        if not prefilter_updates:
+            return 0
+
+        query = "INSERT OR REPLACE INTO ArticleEmbeddingPrefilter (score, ratingId) VALUES (?, ?)"
+        return self.db.execute_many(query, prefilter_updates)
+
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in one call, returning unit-normalized EMBEDDING_DTYPE embeddings"""
+        if self._pool is not None and len(texts) > self.ENCODE_BATCH_SIZE:
+            embeddings = self.model.encode_multi_process(
+                texts,
+                self._pool,
+                batch_size=self.ENCODE_BATCH_SIZE,
+                normalize_embeddings=True
+            )
+        else:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=self.ENCODE_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        return embeddings.astype(EMBEDDING_DTYPE)
+
+    def _start_pool(self):
+        """Start the multi-process encoding pool when more than one worker is configured"""
+        if self.workers <= 1 or self._pool is not None:
+            return
+
+        # encode_multi_process(normalize_embeddings=...) needs sentence-transformers 3.0+
+        if int(sentence_transformers.__version__.split('.')[0]) < self.MIN_POOL_ST_MAJOR:
+            logger.warning(
+                f"sentence-transformers {sentence_transformers.__version__} is too old for "
+                f"multi-process encoding (needs {self.MIN_POOL_ST_MAJOR}.0+); encoding in one process"
+            )
+            return
+
+        self._load_model()
+        device = self.model.device.type
+        if device == 'cpu':
+            target_devices = ['cpu'] * self.workers
+        elif device == 'cuda':
+            # One worker per visible GPU, chosen by sentence-transformers
+            target_devices = None
+        else:
+            # Other accelerators (e.g. MPS) cannot be shared by worker
+            # processes; keep encoding on the model's own device
+            logger.info(f"Model runs on {device}; encoding in one process instead of {self.workers} CPU workers")
+            return
+
+        logger.info(f"Starting embedding pool on {device} ({self.workers} workers requested)")
+        self._pool = self.model.start_multi_process_pool(target_devices)
+
+    def _stop_pool(self):
+        """Stop the multi-process encoding pool if one is running"""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def _encode_missing(self, articles: List) -> Dict[int, np.ndarray]:
         """
-        return self.db.execute_many(query, embedding_updates)
+        Encode every article in the batch that is not cached yet, in one model call.
 
-    def get_or_compute_embedding(self, article_id: int, headline: str, text: str) -> np.ndarray:
-        """Get embedding from cache or compute it"""
+        Texts are sorted by length before encoding ("smart batching") so each
+        mini-batch is padded only to its own longest text.
+
+        Returns:
+            Embeddings for every article referenced by the batch. Entries may
+            be evicted from the LRU cache mid-batch, so callers read from this.
+        """
+        batch_embeddings: Dict[int, np.ndarray] = {}
+        missing: Dict[int, Optional[str]] = {}  # ordered: articleId -> updatedAt
+        for article in articles:
+            for article_id, updated_at in ((article['articleIdNew'], article['updatedAtNew']),
+                                           (article['articleIdApproved'], article['updatedAtApproved'])):
+                if article_id in batch_embeddings or article_id in missing:
+                    continue
+                if article_id in self.embedding_cache:
+                    batch_embeddings[article_id] = self.embedding_cache[article_id]
+                    continue
+                embedding = self.store.get(article_id, updated_at)
+                if embedding is None:
+                    missing[article_id] = updated_at
+                else:
+                    self.embedding_cache[article_id] = embedding
+                    batch_embeddings[article_id] = embedding
+
+        if not missing:
+            return batch_embeddings
+
+        texts = self.get_article_texts(list(missing))
+        pending = {article_id: texts.get(article_id, "") for article_id in missing}
+
+        # Empty text gets zero embedding
+        dimension = self.model.get_sentence_embedding_dimension()
+        to_encode = []
+        for article_id, combined_text in pending.items():
+            if combined_text:
+                to_encode.append((article_id, combined_text))
+            else:
+                batch_embeddings[article_id] = np.zeros(dimension, dtype=EMBEDDING_DTYPE)
+
+        if to_encode:
+            to_encode.sort(key=lambda item: len(item[1]))
+            embeddings = self._encode_texts([combined_text for _, combined_text in to_encode])
+            for (article_id, _), embedding in zip(to_encode, embeddings):
+                batch_embeddings[article_id] = embedding
+
+        for article_id in pending:
+            self.embedding_cache[article_id] = batch_embeddings[article_id]
+        self.store.put_many(list(pending), np.vstack([batch_embeddings[article_id] for article_id in pending]),
+                            [missing[article_id] for article_id in pending])
+
+        return batch_embeddings
+
+    def _compute_prefilter_scores(self, articles: List) -> np.ndarray:
+        """Lexical similarity of each pair from cached hashed bag-of-words vectors"""
+        vectors: Dict[int, np.ndarray] = {}
+        missing: Dict[int, None] = {}  # ordered set
+        for article in articles:
+            for article_id in (article['articleIdNew'], article['articleIdApproved']):
+                if article_id in vectors or article_id in missing:
+                    continue
+                vector = self.prefilter_cache.get(article_id)
+                if vector is None:
+                    missing[article_id] = None
+                else:
+                    vectors[article_id] = vector
+
+        if missing:
+            texts = self.get_article_texts(list(missing))
+            for article_id in missing:
+                vector = compute_hashed_token_vector(texts.get(article_id, "")).astype(EMBEDDING_DTYPE)
+                self.prefilter_cache[article_id] = vector
+                vectors[article_id] = vector
+
+        vectors_new = np.vstack([vectors[article['articleIdNew']] for article in articles])
+        vectors_approved = np.vstack([vectors[article['articleIdApproved']] for article in articles])
+        return compute_pairwise_similarities(vectors_new, vectors_approved)
+
+    def get_or_compute_embedding(self, article_id: int, headline: str, text: str,
+                                 updated_at: Optional[str] = None) -> np.ndarray:
+        """Get embedding from cache or compute it; updated_at versions the stored copy"""
         if article_id in self.embedding_cache:
             return self.embedding_cache[article_id]
 
+        self._load_model()
+        embedding = self.store.get(article_id, updated_at)
+        if embedding is not None:
+            self.embedding_cache[article_id] = embedding
+            return embedding
+
         # Combine text and compute embedding
         combined_text = combine_article_text(headline, text)
         if not combined_text:
             # Empty text gets zero embedding
-            embedding = np.zeros(self.model.get_sentence_embedding_dimension())
+            embedding = np.zeros(self.model.get_sentence_embedding_dimension(), dtype=EMBEDDING_DTYPE)
         else:
-            embedding = self.model.encode([combined_text])[0]
+            embedding = self._encode_texts([combined_text])[0]
 
         # Cache the result
         self.embedding_cache[article_id] = embedding
+        self.store.put_many([article_id], embedding[np.newaxis], [updated_at])
+        self.store.flush()
         return embedding
 
     def process_embedding_search_batch(self, batch_size: int = 500) -> dict:
@@ -184,7 +520,7 @@ class EmbeddingProcessor:
         self._load_model()
 
         # Get articles that need embedding processing
-        articles = self.get_articles_for_embedding_search(batch_size)
+        articles = self.get_articles_for_embedding_search(batch_size, after_id=self._last_processed_id)
 
         if not articles:
             return {
@@ -195,57 +531,68 @@ class EmbeddingProcessor:
             }
 
         logger.info(f"Processing embeddings for {len(articles)} article pairs")
+        self._last_processed_id = articles[-1]['id']
 
-        embedding_updates = []
-        similarities = []
+        rating_ids = [article['id'] for article in articles]
         errors = 0
-
-        # Use tqdm for progress bar - updates in place without new lines
-        with tqdm(articles, desc="Computing embeddings", unit="pairs", leave=False) as pbar:
-            for article in pbar:
-                try:
-                    # Get or compute embeddings for both articles
-                    embedding_new = self.get_or_compute_embedding(
-                        article['articleIdNew'],
-                        article['headlineNew'],
-                        article['textNew']
-                    )
-                    embedding_approved = self.get_or_compute_embedding(
-                        article['articleIdApproved'],
-                        article['headlineApproved'],
-                        article['textApproved']
-                    )
-
-                    # Compute similarity score
-                    similarity = compute_cosine_similarity(embedding_new, embedding_approved)
-                    similarities.append(similarity)
-
-                    embedding_updates.append((similarity, article['id']))
-
-                    # Update progress bar with current similarity
-                    pbar.set_postfix({
-                        'similarity': f'{similarity:.3f}',
-                        'cached': len(self.embedding_cache)
-                    })
-
-                except Exception as e:
-                    logger.error(f"Error processing embeddings for pair {article['id']}: {e}")
-                    errors += 1
-                    # Set embeddingSearch to 0.0 for failed comparisons
-                    embedding_updates.append((0.0, article['id']))
+        prefiltered = 0
+
+        prefilter_updates: List[Tuple[float, int]] = []
+
+        try:
+            if self.prefilter_threshold > 0:
+                # Lexically dissimilar pairs never reach the model; their
+                # score is recorded apart from embeddingSearch
+                prefilter_scores = self._compute_prefilter_scores(articles)
+                needs_embedding = prefilter_scores >= self.prefilter_threshold
+                prefilter_updates = [(float(score), rating_id)
+                                     for score, rating_id, keep in zip(prefilter_scores, rating_ids, needs_embedding)
+                                     if not keep]
+                prefiltered = len(prefilter_updates)
+            else:
+                needs_embedding = np.ones(len(articles), dtype=bool)
+
+            to_embed = [article for article, keep in zip(articles, needs_embedding) if keep]
+            rating_ids = [article['id'] for article in to_embed]
+            similarities = []
+            if to_embed:
+                # Encode all uncached articles in this batch up front
+                batch_embeddings = self._encode_missing(to_embed)
+
+                # Stack both sides and take row-wise dot products in one call;
+                # embeddings are unit-normalized so this is the cosine similarity
+                embeddings_new = np.vstack([batch_embeddings[article['articleIdNew']] for article in to_embed])
+                embeddings_approved = np.vstack([batch_embeddings[article['articleIdApproved']] for article in to_embed])
+                similarities = compute_pairwise_similarities(embeddings_new, embeddings_approved).tolist()
+        except Exception as e:
+            logger.error(f"Error computing embedding similarities for batch: {e}")
+            errors = len(rating_ids)
+            similarities = []
+
+        if errors:
+            # Set embeddingSearch to 0.0 for failed comparisons
+            embedding_updates = [(0.0, rating_id) for rating_id in rating_ids]
+        else:
+            embedding_updates = list(zip(similarities, rating_ids))
 
         # Update database with results
         updated_count = self.update_embedding_search_batch(embedding_updates)
+        self.record_prefilter_scores(prefilter_updates)
+        self.store.flush()
 
         # Calculate statistics
         high_similarity_count = sum(1 for s in similarities if s > 0.8)
-        avg_similarity = sum(similarities) / len(similarities) if similarities else 0.0
+        similarity_sum = sum(similarities)
+        avg_similarity = similarity_sum / len(similarities) if similarities else 0.0
 
         stats = {
             'processed': len(articles),
             'high_similarity': high_similarity_count,
             'avg_similarity': avg_similarity,
+            'similarity_sum': similarity_sum,
+            'similarity_count': len(similarities),
             'errors': errors,
+            'prefiltered': prefiltered,
             'updated_db_rows': updated_count,
             'cached_embeddings': len(self.embedding_cache)
         }
@@ -263,9 +610,15 @@ class EmbeddingProcessor:
         Returns:
             Dictionary with overall processing statistics
         """
+        # Start from the beginning of the table on every full run
+        self._last_processed_id = 0
+
+        # Exact content matches are settled in SQL before any encoding
+        total_resolved_by_hash = self.resolve_content_hash_matches()
+
         # Get total count first
         stats = self.get_embedding_search_stats()
-        total_pending = stats['embedding_search_pending']
+        total_pending = stats['embedding_search_pending'] - self.count_prefiltered_pending()
 
         if total_pending == 0:
             return {
@@ -273,49 +626,59 @@ class EmbeddingProcessor:
                 'total_high_similarity': 0,
                 'overall_avg_similarity': 0.0,
                 'total_errors': 0,
+                'total_prefiltered': 0,
+                'total_resolved_by_hash': total_resolved_by_hash,
                 'batches_completed': 0
             }
 
         total_processed = 0
         total_high_similarity = 0
-        all_similarities = []
+        total_sim_sum = 0.0
+        total_sim_count = 0
         total_errors = 0
+        total_prefiltered = 0
         batches_completed = 0
 
-        # Overall progress bar
-        with tqdm(total=total_pending, desc="Overall embedding progress", unit="pairs") as overall_pbar:
-            while True:
-                batch_result = self.process_embedding_search_batch(batch_size)
-
-                if batch_result['processed'] == 0:
-                    break
-
-                total_processed += batch_result['processed']
-                total_high_similarity += batch_result['high_similarity']
-                total_errors += batch_result['errors']
-                batches_completed += 1
-
-                # Update overall progress
-                overall_pbar.update(batch_result['processed'])
-                overall_pbar.set_postfix({
-                    'batch_avg': f"{batch_result['avg_similarity']:.3f}",
-                    'high_sim': total_high_similarity,
-                    'cached': batch_result.get('cached_embeddings', 0)
-                })
-
-                # Collect similarities for overall average
-                if batch_result['avg_similarity'] > 0:
-                    # Approximate individual similarities based on batch average
-                    batch_similarities = [batch_result['avg_similarity']] * batch_result['processed']
-                    all_similarities.extend(batch_similarities)
-
-        overall_avg_similarity = sum(all_similarities) / len(all_similarities) if all_similarities else 0.0
+        # Workers only encode; scores are still written from this process
+        self._start_pool()
+        try:
+            # Overall progress bar
+            # Repaint at most twice a second however fast batches complete
+            with tqdm(total=total_pending, desc="Overall embedding progress", unit="pairs", mininterval=0.5) as overall_pbar:
+                while True:
+                    batch_result = self.process_embedding_search_batch(batch_size)
+
+                    if batch_result['processed'] == 0:
+                        break
+
+                    total_processed += batch_result['processed']
+                    total_high_similarity += batch_result['high_similarity']
+                    total_errors += batch_result['errors']
+                    total_prefiltered += batch_result['prefiltered']
+                    total_sim_sum += batch_result['similarity_sum']
+                    total_sim_count += batch_result['similarity_count']
+                    batches_completed += 1
+
+                    # Update overall progress; the postfix is only drawn by
+                    # update()'s throttled repaint, never forced
+                    overall_pbar.set_postfix({
+                        'batch_avg': f"{batch_result['avg_similarity']:.3f}",
+                        'high_sim': total_high_similarity,
+                        'cached': batch_result.get('cached_embeddings', 0)
+                    }, refresh=False)
+                    overall_pbar.update(batch_result['processed'])
+        finally:
+            self._stop_pool()
+
+        overall_avg_similarity = total_sim_sum / total_sim_count if total_sim_count else 0.0
 
         return {
             'total_processed': total_processed,
             'total_high_similarity': total_high_similarity,
             'overall_avg_similarity': overall_avg_similarity,
             'total_errors': total_errors,
+            'total_prefiltered': total_prefiltered,
+            'total_resolved_by_hash': total_resolved_by_hash,
             'batches_completed': batches_completed,
             'final_cache_size': len(self.embedding_cache)
         }
\ No newline at end of file
@@ -7,14 +7,23 @@ near-duplicate textual content.
 """
 
 import hashlib
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional, List, Tuple
 import logging
 
-from db import DatabaseManager
+from db import DatabaseManager, utc_timestamp
 
 logger = logging.getLogger(__name__)
 
+# ASCII text goes through str.translate (a C table lookup per character);
+# other text falls back to the equivalent compiled regex
+_ASCII_NONALNUM_TO_SPACE = str.maketrans({
+    chr(i): ' ' for i in range(128) if not (chr(i).isalnum() or chr(i).isspace())
+})
+_RE_NONALNUM = re.compile(r'[^a-zA-Z0-9\s]')
+
 
 def normalize_text(text: str) -> str:
     """
@@ -28,14 +37,16 @@ def normalize_text(text: str) -> str:
         return ""
 
     # Convert to lowercase and remove non-alphanumeric except spaces
-    normalized = re.sub(r'[^a-zA-Z0-9\s]', ' ', text.lower())
-    # Collapse multiple whitespace to single space
-    normalized = re.sub(r'\s+', ' ', normalized)
-    # Strip leading/trailing whitespace
-    return normalized.strip()
+    text = text.lower()
+    if text.isascii():
+        normalized = text.translate(_ASCII_NONALNUM_TO_SPACE)
+    else:
+        normalized = _RE_NONALNUM.sub(' ', text)
+    # Collapse whitespace runs to single spaces and strip the ends
+    return ' '.join(normalized.split())
 
 
-def compute_content_hash(headline: Optional[str], text: Optional[str]) -> str:
+def compute_content_hash(headline: Optional[str], text: Optional[str]) -> bytes:
     """
     Compute a hash of the article content based on headline and text.
 
@@ -44,7 +55,7 @@ def compute_content_hash(headline: Optional[str], text: Optional[str]) -> str:
         text: Article text content
 
     Returns:
-        SHA-256 hex digest of normalized content
+        Raw 32-byte SHA-256 digest of normalized content
     """
     # Normalize both headline and text
     norm_headline = normalize_text(headline) if headline else ""
@@ -53,11 +64,11 @@ def compute_content_hash(headline: Optional[str], text: Optional[str]) -> str:
     # Combine headline and text with separator
     combined_content = f"{norm_headline}|||{norm_text}"
 
-    # Compute SHA-256 hash
-    return hashlib.sha256(combined_content.encode('utf-8')).hexdigest()
+    # Compute SHA-256 hash; only compared for equality, so skip hex encoding
+    return hashlib.sha256(combined_content.encode('utf-8', 'replace'), usedforsecurity=False).digest()
 
 
-def compute_content_hash_similarity(hash1: str, hash2: str) -> float:
+def compute_content_hash_similarity(hash1: bytes, hash2: bytes) -> float:
     """
     Compute similarity between two content hashes.
 
@@ -71,130 +82,173 @@ def compute_content_hash_similarity(hash1: str, hash2: str) -> float:
     return 1.0 if hash1 == hash2 else 0.0
 
 
+def _hash_article(article: Tuple[int, Optional[str], Optional[str]]) -> Tuple[int, bytes, Optional[str]]:
+    """
+    Hash one (articleId, headline, text) row; module-level so worker processes can run it.
+
+    Returns:
+        (articleId, digest, error message or None). A failed article gets a
+        hash no other article can share, so its pairs score 0.0.
+    """
+    article_id, headline, text = article
+    try:
+        return article_id, compute_content_hash(headline, text), None
+    except Exception as e:
+        return article_id, f"error:{article_id}".encode(), str(e)
+
+
 class ContentHashProcessor:
-    """Processes content hash metrics for article pairs"""
+    """
+    Processes content hash metrics for article pairs.
+
+    Each article is hashed once per updatedAt into ArticleContentHashes; pair scores are
+    then resolved by comparing stored hashes in a single SQL UPDATE.
+    """
+
+    # Below this many articles, starting worker processes costs more than it saves
+    PARALLEL_MIN_ARTICLES = 5000
+    PARALLEL_CHUNKSIZE = 256
 
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
+        self._ensure_hash_table()
+
+    def _ensure_hash_table(self):
+        """Create the per-article content hash table if it does not exist"""
+        # Hashes were stored as hex TEXT before they became raw 32-byte BLOBs;
+        # the two never compare equal, so drop an old-format table and rehash
+        columns = self.db.execute_query("PRAGMA table_info(ArticleContentHashes)")
+        if any(column['name'] == 'hash' and column['type'] != 'BLOB' for column in columns):
+            self.db.execute_update("DROP TABLE ArticleContentHashes")
 
-    def get_articles_for_content_hash(self, batch_size: int = 1000) -> List:
-        """Get article pairs that need content hash checking (contentHash is NULL)"""
         query = """
-        SELECT
-            adr.id,
-            adr.articleIdNew,
-            adr.articleIdApproved,
-            aa1.headlineForPdfReport as headlineNew,
-            aa1.textForPdfReport as textNew,
-            aa2.headlineForPdfReport as headlineApproved,
-            aa2.textForPdfReport as textApproved
-        FROM ArticleDuplicateRatings adr
-        JOIN ArticleApproveds aa1 ON aa1.articleId = adr.articleIdNew
-        JOIN ArticleApproveds aa2 ON aa2.articleId = adr.articleIdApproved
-        WHERE adr.contentHash IS NULL
-        LIMIT ?
+        CREATE TABLE IF NOT EXISTS ArticleContentHashes (
+            articleId INTEGER PRIMARY KEY,
+            hash BLOB NOT NULL,
+            sourceUpdatedAt TEXT
+        )
         """
-        return self.db.execute_query(query, (batch_size,))
+        self.db.execute_update(query)
 
-    def update_content_hash_batch(self, content_hash_updates: List[Tuple[float, int]]) -> int:
-        """Update contentHash values for multiple rating IDs"""
-        if not content_hash_updates:
-            return 0
+        # sourceUpdatedAt records which version of the article text was hashed;
+        # tables from before it existed get the column, and their NULLs rehash once
+        columns = self.db.execute_query("PRAGMA table_info(ArticleContentHashes)")
+        if not any(column['name'] == 'sourceUpdatedAt' for column in columns):
+            self.db.execute_update("ALTER TABLE ArticleContentHashes ADD COLUMN sourceUpdatedAt TEXT")
 
-        query = """
-        UPDATE ArticleDuplicateRatings
-        SET contentHash = ?, updatedAt = datetime('now')
-        WHERE id = ?
+    def clear_content_hashes(self) -> int:
+        """Clear stored per-article hashes so they are recomputed from current text"""
+        return self.db.execute_update("DELETE FROM ArticleContentHashes")
+
+    def get_articles_for_content_hash(self) -> List:
         """
-        return self.db.execute_many(query, content_hash_updates)
+        Get articles referenced by pending pairs (contentHash is NULL) whose stored hash is missing or stale.
 
-    def process_content_hash_batch(self, batch_size: int = 1000) -> dict:
+        A stored hash is stale when the article's ArticleApproveds updatedAt
+        differs from the one recorded when it was hashed. The headline and
+        text come from the article's most recently updated row.
         """
-        Process a batch of article pairs for content hash computation.
+        query = """
+        SELECT
+            aa.articleId,
+            aa.headlineForPdfReport as headline,
+            aa.textForPdfReport as text,
+            MAX(aa.updatedAt) as updatedAt
+        FROM ArticleApproveds aa
+        LEFT JOIN ArticleContentHashes h ON h.articleId = aa.articleId
+        WHERE aa.articleId IN (
+            SELECT articleIdNew FROM ArticleDuplicateRatings WHERE contentHash IS NULL
+            UNION
+            SELECT articleIdApproved FROM ArticleDuplicateRatings WHERE contentHash IS NULL
+        )
+        GROUP BY aa.articleId
+        HAVING h.sourceUpdatedAt IS NOT MAX(aa.updatedAt)
+        """
+        return self.db.execute_query(query)
 
-        Args:
-            batch_size: Number of pairs to process in this batch
+    def hash_pending_articles(self) -> dict:
+        """
+        Compute and store content hashes for every article that pending pairs need.
 
         Returns:
-            Dictionary with processing statistics
+            Dictionary with counts: hashed, errors
         """
-        # Get articles that need content hash processing
-        articles = self.get_articles_for_content_hash(batch_size)
-
-        if not articles:
-            return {
-                'processed': 0,
-                'matches': 0,
-                'non_matches': 0,
-                'errors': 0
-            }
+        rows = self.get_articles_for_content_hash()
+        articles = [(row['articleId'], row['headline'], row['text']) for row in rows]
+        updated_at = {row['articleId']: row['updatedAt'] for row in rows}
+        logger.info(f"Computing content hash for {len(articles)} articles")
+
+        workers = os.cpu_count() or 1
+        if workers > 1 and len(articles) >= self.PARALLEL_MIN_ARTICLES:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_hash_article, articles, chunksize=self.PARALLEL_CHUNKSIZE))
+        else:
+            results = [_hash_article(article) for article in articles]
+
+        hash_rows = []
+        errors = 0
+        for article_id, content_hash, error in results:
+            if error is not None:
+                logger.error(f"Error computing content hash for article {article_id}: {error}")
+                errors += 1
+            hash_rows.append((article_id, content_hash, updated_at[article_id]))
 
-        logger.info(f"Processing content hash for {len(articles)} article pairs")
+        query = "INSERT OR REPLACE INTO ArticleContentHashes (articleId, hash, sourceUpdatedAt) VALUES (?, ?, ?)"
+        self.db.execute_many(query, hash_rows)
 
-        content_hash_updates = []
-        matches = 0
-        errors = 0
+        return {'hashed': len(hash_rows), 'errors': errors}
 
-        for article in articles:
-            try:
-                # Compute content hashes for both articles
-                hash_new = compute_content_hash(
-                    article['headlineNew'],
-                    article['textNew']
-                )
-                hash_approved = compute_content_hash(
-                    article['headlineApproved'],
-                    article['textApproved']
-                )
+    def resolve_pending_pairs(self) -> dict:
+        """
+        Set contentHash for all pending pairs by comparing stored article hashes.
 
-                # Compute similarity score
-                similarity = compute_content_hash_similarity(hash_new, hash_approved)
+        Returns:
+            Dictionary with counts: processed, matches
+        """
+        pending_condition = """
+        ArticleDuplicateRatings.contentHash IS NULL
+          AND h1.articleId = ArticleDuplicateRatings.articleIdNew
+          AND h2.articleId = ArticleDuplicateRatings.articleIdApproved
+        """
+        count_query = f"""
+        SELECT COUNT(*)
+        FROM ArticleDuplicateRatings, ArticleContentHashes h1, ArticleContentHashes h2
+        WHERE {pending_condition} AND h1.hash = h2.hash
+        """
+        update_query = f"""
+        UPDATE ArticleDuplicateRatings
+        SET contentHash = (h1.hash = h2.hash), updatedAt = ?
+        FROM ArticleContentHashes h1, ArticleContentHashes h2
+        WHERE {pending_condition}
+        """
 
-                if similarity == 1.0:
-                    matches += 1
+        with self.db.get_connection() as conn:
+            matches = conn.execute(count_query).fetchone()[0]
+            processed = conn.execute(update_query, (utc_timestamp(),)).rowcount
 
-                content_hash_updates.append((similarity, article['id']))
+        return {'processed': processed, 'matches': matches}
 
-            except Exception as e:
-                logger.error(f"Error processing content hash for pair {article['id']}: {e}")
-                errors += 1
-                # Set contentHash to 0.0 for failed comparisons
-                content_hash_updates.append((0.0, article['id']))
+    def process_content_hash(self) -> dict:
+        """
+        Compute content hash scores for all pending article pairs.
 
-        # Update database with results
-        updated_count = self.update_content_hash_batch(content_hash_updates)
+        Returns:
+            Dictionary with processing statistics
+        """
+        hash_stats = self.hash_pending_articles()
+        pair_stats = self.resolve_pending_pairs()
 
         stats = {
-            'processed': len(articles),
-            'matches': matches,
-            'non_matches': len(articles) - matches - errors,
-            'errors': errors,
-            'updated_db_rows': updated_count
+            'processed': pair_stats['processed'],
+            'matches': pair_stats['matches'],
+            'non_matches': pair_stats['processed'] - pair_stats['matches'],
+            'articles_hashed': hash_stats['hashed'],
+            'errors': hash_stats['errors']
         }
 
-        logger.info(f"Content hash batch completed: {stats}")
+        logger.info(f"Content hash completed: {stats}")
         return stats
 
     def get_content_hash_stats(self) -> dict:
         """Get statistics about content hash progress"""
-        stats = {}
-
-        # Total pairs
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings"
-        result = self.db.execute_query(query)
-        stats['total_pairs'] = result[0]['count']
-
-        # Pairs with content hash completed
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings WHERE contentHash IS NOT NULL"
-        result = self.db.execute_query(query)
-        stats['content_hash_completed'] = result[0]['count']
-
-        # Pairs pending content hash
-        stats['content_hash_pending'] = stats['total_pairs'] - stats['content_hash_completed']
-
-        # Matching content (contentHash = 1)
-        query = "SELECT COUNT(*) as count FROM ArticleDuplicateRatings WHERE contentHash = 1"
-        result = self.db.execute_query(query)
-        stats['matching_content'] = result[0]['count']
-
-        return stats
\ No newline at end of file
+        return self.db.get_content_hash_stats()
\ No newline at end of file
@@ -5,6 +5,10 @@ Creates pairwise combinations of new articles from CSV with approved articles
 and populates the ArticleDuplicateRatings table.
 """
 
+import importlib.util
+import sys
+from array import array
+from itertools import islice, product
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
 
@@ -12,22 +16,38 @@ from config import Config
 from db import DatabaseManager
 from csv_utils.load_csv import CSVLoader
 
+# tqdm is only imported when a progress bar is actually shown
+TQDM_AVAILABLE = importlib.util.find_spec('tqdm') is not None
+
 
 class PairIndexer:
     """Service for creating article pairs and populating ArticleDuplicateRatings table"""
 
-    def __init__(self, config: Config):
+    # Run ANALYZE after inserting at least this many new pairs
+    ANALYZE_THRESHOLD = 10000
+
+    # Above this many candidate pairs, secondary indexes are dropped for the
+    # insert and rebuilt afterwards instead of being updated row by row...
+    DROP_INDEXES_THRESHOLD = 100000
+    # ...but only while the table holds at most this fraction of the candidate
+    # count: rebuilding scans the whole table, which only pays off when most
+    # rows are new, and a rerun of an existing load must never pay it
+    DROP_INDEXES_MAX_EXISTING_RATIO = 0.25
+
+    # Without a progress bar, report every this many batches
+    PROGRESS_EVERY_BATCHES = 100
+
+    def __init__(self, config: Config, read_only: bool = False):
         self.config = config
-        self.db_manager = DatabaseManager(config)
+        self.db_manager = DatabaseManager(config, read_only=read_only)
         self.csv_loader = CSVLoader(self.db_manager)
 
-    def create_pairs_from_csv(self, csv_path: Path | str, force: bool = False) -> Dict[str, int]:
+    def create_pairs_from_csv(self, csv_path: Path | str) -> Dict[str, int]:
         """
         Load article IDs from CSV and create pairwise combinations with approved articles.
 
         Args:
             csv_path: Path to CSV file containing article IDs
-            force: If True, recreate pairs even if they already exist
 
         Returns:
             Dictionary with counts: new_pairs, existing_pairs, total_pairs
@@ -46,6 +66,11 @@ class PairIndexer:
 
         print(f"Processing {len(new_article_ids)} new article IDs")
 
+        # Sorted new IDs with the (already sorted) approved IDs make product()
+        # emit pairs in unique-index key order, so inserts append to the
+        # B-tree's rightmost leaf instead of splitting pages throughout it
+        new_article_ids = array('q', sorted(new_article_ids))
+
         # Get approved article IDs
         approved_article_ids = self.db_manager.get_approved_article_ids()
         print(f"Found {len(approved_article_ids)} approved articles")
@@ -54,36 +79,51 @@ class PairIndexer:
             print("No approved articles found in ArticleApproveds table")
             return {"new_pairs": 0, "existing_pairs": 0, "total_pairs": 0}
 
-        # Check for existing pairs if not forcing
-        existing_pairs_count = 0
-        if not force:
-            existing_pairs_count = self.db_manager.get_existing_pairs_count(new_article_ids)
-            print(f"Found {existing_pairs_count} existing pairs")
-
-        # Create pairs (cartesian product)
-        pairs_to_insert = []
+        # Stream pairs (cartesian product) instead of materializing them.
+        # Existing pairs are skipped by INSERT OR IGNORE against the unique
+        # (articleIdNew, articleIdApproved) index, so no pre-count is needed.
+        # Both ID lists arrive as packed array('q') columns rather than lists of ints.
         total_possible_pairs = len(new_article_ids) * len(approved_article_ids)
+        pairs_iter = product(new_article_ids, approved_article_ids)
 
         print(f"Creating {total_possible_pairs} article pairs...")
 
-        for new_article_id in new_article_ids:
-            for approved_article_id in approved_article_ids:
-                pairs_to_insert.append((new_article_id, approved_article_id))
-
-        # Insert pairs in batches for efficiency
+        # Insert pairs in batches for efficiency, all in one transaction
         new_pairs_count = 0
-        if pairs_to_insert:
-            batch_size = 1000
-            batches = [pairs_to_insert[i:i + batch_size] for i in range(0, len(pairs_to_insert), batch_size)]
+        batch_size = self.config.PAIR_INSERT_BATCH_SIZE
+        num_batches = -(-total_possible_pairs // batch_size)
+
+        print(f"Inserting pairs in {num_batches} batches of {batch_size}...")
+
+        # One transaction for the whole load: under WAL with synchronous=NORMAL
+        # that means a single commit and no per-batch fsyncs
+        with self.db_manager.get_connection():
+            dropped_indexes = []
+            if self._should_drop_indexes(total_possible_pairs):
+                dropped_indexes = self.db_manager.drop_rating_indexes()
+
+            # A progress bar on a terminal; otherwise (logs, CI) occasional lines
+            # so output does not block the batch loop
+            use_bar = TQDM_AVAILABLE and sys.stdout.isatty()
+            batches = range(1, num_batches + 1)
+            if use_bar:
+                from tqdm import tqdm
+                batches = tqdm(batches, desc="Inserting pairs", unit="batch", mininterval=0.5)
+
+            for i in batches:
+                inserted_count = self.db_manager.insert_duplicate_ratings_batch(islice(pairs_iter, batch_size))
+                new_pairs_count += inserted_count
 
-            print(f"Inserting pairs in {len(batches)} batches of {batch_size}...")
+                if not use_bar and (i % self.PROGRESS_EVERY_BATCHES == 0 or i == num_batches):
+                    print(f"Processed batch {i}/{num_batches} - inserted {new_pairs_count} new pairs so far")
 
-            for i, batch in enumerate(batches, 1):
-                inserted_count = self.db_manager.insert_duplicate_ratings_batch(batch)
-                new_pairs_count += inserted_count
+            if dropped_indexes:
+                print(f"Rebuilding {len(dropped_indexes)} indexes...")
+                self.db_manager.rebuild_rating_indexes(dropped_indexes)
 
-                if i % 10 == 0 or i == len(batches):  # Progress update every 10 batches
-                    print(f"Processed batch {i}/{len(batches)} - inserted {new_pairs_count} new pairs so far")
+        # Large inserts shift the table's distribution; refresh planner stats
+        if new_pairs_count >= self.ANALYZE_THRESHOLD:
+            self.db_manager.analyze()
 
         # Get final statistics
         total_pairs = self.db_manager.get_duplicate_ratings_count()
@@ -99,6 +139,21 @@ class PairIndexer:
 
         return result
 
+    def _should_drop_indexes(self, total_possible_pairs: int) -> bool:
+        """
+        Decide whether dropping and rebuilding secondary indexes beats updating them.
+
+        Args:
+            total_possible_pairs: Candidate pairs about to be inserted
+
+        Returns:
+            True if the load is large and the table is small next to it
+        """
+        if total_possible_pairs < self.DROP_INDEXES_THRESHOLD:
+            return False
+        existing_rows = self.db_manager.get_duplicate_ratings_count()
+        return existing_rows <= total_possible_pairs * self.DROP_INDEXES_MAX_EXISTING_RATIO
+
     def reset_ratings_table(self) -> int:
         """
         Clear all data from ArticleDuplicateRatings table.
@@ -5,28 +5,43 @@ Computes URL similarity scores by canonicalizing URLs and checking for exact mat
 Populates the urlCheck column in ArticleDuplicateRatings table.
 """
 
-from typing import Dict, List, Tuple, Any
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Any, Optional
 
 from config import Config
-from db import DatabaseManager
-from utils.canonical_url import URLCanonicalizer
+from db import DatabaseManager, utc_timestamp
+from utils.canonical_url import URLCanonicalizer, canonicalize_url
 from utils.timing import timer
 
 
 class URLCheckService:
     """Service for computing URL similarity scores"""
 
-    def __init__(self, config: Config):
+    # Below this many distinct URLs, starting worker processes costs more than it saves
+    PARALLEL_MIN_URLS = 20000
+    PARALLEL_CHUNKSIZE = 2048
+
+    # Below this many distinct URLs, parsing them directly is cheaper than
+    # loading and rewriting the on-disk URL cache
+    CACHE_MIN_URLS = 20000
+
+    def __init__(self, config: Config, read_only: bool = False):
         self.config = config
-        self.db_manager = DatabaseManager(config)
+        self.db_manager = DatabaseManager(config, read_only=read_only)
         self.canonicalizer = URLCanonicalizer()
 
     def compute_url_check_scores(self, batch_size: int = 1000, force: bool = False) -> Dict[str, int]:
         """
         Compute URL check scores for all article pairs.
 
+        Each referenced article's URL is canonicalized once; pairs are then
+        scored in SQL by comparing canonical URLs.
+
         Args:
-            batch_size: Number of pairs to process at once
+            batch_size: Number of canonical URLs staged per batch
             force: If True, recompute even if urlCheck already exists
 
         Returns:
@@ -38,45 +53,12 @@ class URLCheckService:
             print("Force mode: clearing existing URL check scores")
             self._clear_url_check_scores()
 
-        total_processed = 0
-        total_matches = 0
-        batch_count = 0
-
-        while True:
-            # Get batch of article pairs that need URL checking
-            if force:
-                pairs = self._get_all_pairs_batch(batch_size, batch_count * batch_size)
-            else:
-                pairs = self.db_manager.get_articles_for_url_check(batch_size)
-
-            if not pairs:
-                break
-
-            batch_count += 1
-            print(f"Processing batch #{batch_count} ({len(pairs)} pairs)")
-
-            # Compute URL check scores for this batch
-            url_check_updates = []
-            batch_matches = 0
-
-            for pair in pairs:
-                url_check_score = self._compute_url_similarity(pair['urlNew'], pair['urlApproved'])
-                url_check_updates.append((url_check_score, pair['id']))
-
-                if url_check_score == 1.0:
-                    batch_matches += 1
+        articles = self.db_manager.get_article_urls_for_url_check()
+        print(f"Canonicalizing URLs for {len(articles)} articles")
 
-            # Update database with batch results
-            if url_check_updates:
-                updated_count = self.db_manager.update_url_check_batch(url_check_updates)
-                total_processed += updated_count
-                total_matches += batch_matches
-
-                print(f"Updated {updated_count} pairs, found {batch_matches} URL matches in this batch")
-
-            # Progress report every 10 batches
-            if batch_count % 10 == 0:
-                print(f"Progress: {total_processed} pairs processed, {total_matches} total matches found")
+        canonical_by_url = self._canonicalize_distinct([article['url'] for article in articles])
+        canonical_urls = ((article['id'], canonical_by_url[article['url']]) for article in articles)
+        total_processed, total_matches = self.db_manager.resolve_url_checks(canonical_urls, batch_size)
 
         # Final statistics
         stats = {
@@ -89,53 +71,52 @@ class URLCheckService:
 
         return stats
 
-    def _compute_url_similarity(self, url1: str, url2: str) -> float:
+    def _canonicalize_distinct(self, urls: List[str]) -> Dict[str, Optional[str]]:
         """
-        Compute URL similarity score (0.0 or 1.0 for exact match after canonicalization).
+        Canonicalize each distinct URL once, across worker processes when there are many.
+
+        For large runs, URLs canonicalized by the previous run are read from
+        the on-disk URL cache and only new URLs are parsed. The cache is then
+        rewritten with just this run's URLs, so it tracks the articles still
+        referenced by pending pairs instead of growing without bound.
 
         Args:
-            url1: First URL
-            url2: Second URL
+            urls: Raw URLs, possibly repeated
 
         Returns:
-            1.0 if URLs match after canonicalization, 0.0 otherwise
+            Mapping of raw URL to canonical URL (None if invalid)
         """
-        try:
-            # Handle None/null URLs
-            if not url1 or not url2:
-                return 0.0
-
-            # Use canonicalizer to check if URLs match
-            if self.canonicalizer.urls_match(url1, url2):
-                return 1.0
-            else:
-                return 0.0
+        distinct_urls = list(dict.fromkeys(urls))
+        use_cache = len(distinct_urls) >= self.CACHE_MIN_URLS
+        cache_path = Path(self.config.URL_CACHE_PATH)
+        cached = self.canonicalizer.load_cache(cache_path) if use_cache else {}
+
+        canonical_by_url = {url: cached[url] for url in distinct_urls if url in cached}
+        missing_urls = [url for url in distinct_urls if url not in canonical_by_url]
+        if use_cache:
+            print(f"Canonical URLs cached from earlier runs: {len(canonical_by_url)}/{len(distinct_urls)}")
+
+        workers = os.cpu_count() or 1
+        if workers > 1 and len(missing_urls) >= self.PARALLEL_MIN_URLS:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                canonical = executor.map(canonicalize_url, missing_urls, chunksize=self.PARALLEL_CHUNKSIZE)
+                canonical_by_url.update(zip(missing_urls, canonical))
+        else:
+            canonical_by_url.update((url, self.canonicalizer.canonicalize_url(url)) for url in missing_urls)
 
-        except Exception as e:
-            # Log error but don't fail the batch
-            print(f"Warning: Error comparing URLs '{url1}' and '{url2}': {e}")
-            return 0.0
+        # Rewrite only when the kept set differs from what is on disk
+        if use_cache and (missing_urls or len(cached) != len(canonical_by_url)):
+            try:
+                self.canonicalizer.save_cache(cache_path, canonical_by_url)
+            except OSError as e:
+                print(f"Warning: could not save URL cache to {cache_path}: {e}")
 
-    def _get_all_pairs_batch(self, batch_size: int, offset: int) -> List:
-        """Get all article pairs for force mode (ignoring existing urlCheck values)"""
-        query = """
-        SELECT
-            adr.id,
-            adr.articleIdNew,
-            adr.articleIdApproved,
-            a1.url as urlNew,
-            a2.url as urlApproved
-        FROM ArticleDuplicateRatings adr
-        JOIN Articles a1 ON a1.id = adr.articleIdNew
-        JOIN Articles a2 ON a2.id = adr.articleIdApproved
-        LIMIT ? OFFSET ?
-        """
-        return self.db_manager.execute_query(query, (batch_size, offset))
+        return canonical_by_url
 
     def _clear_url_check_scores(self) -> int:
         """Clear all existing URL check scores"""
-        query = "UPDATE ArticleDuplicateRatings SET urlCheck = NULL, updatedAt = datetime('now')"
-        return self.db_manager.execute_update(query)
+        query = "UPDATE ArticleDuplicateRatings SET urlCheck = NULL, updatedAt = ? WHERE urlCheck IS NOT NULL"
+        return self.db_manager.execute_update(query, (utc_timestamp(),))
 
     def get_url_check_status(self) -> Dict[str, Any]:
         """
@@ -169,32 +150,31 @@ class URLCheckService:
         Returns:
             List of dictionaries with URL comparison details
         """
+        # Pair IDs only; each article's URL is then read once, not once per pair
         query = """
-        SELECT
-            adr.articleIdNew,
-            adr.articleIdApproved,
-            adr.urlCheck,
-            a1.url as urlNew,
-            a2.url as urlApproved
-        FROM ArticleDuplicateRatings adr
-        JOIN Articles a1 ON a1.id = adr.articleIdNew
-        JOIN Articles a2 ON a2.id = adr.articleIdApproved
-        WHERE adr.urlCheck IS NOT NULL
-        ORDER BY adr.urlCheck DESC, adr.id
+        SELECT articleIdNew, articleIdApproved, urlCheck
+        FROM ArticleDuplicateRatings
+        WHERE urlCheck IS NOT NULL
+        ORDER BY urlCheck DESC, id
         LIMIT ?
         """
         rows = self.db_manager.execute_query(query, (limit,))
+        url_map = self.db_manager.get_url_map(
+            chain.from_iterable((row['articleIdNew'], row['articleIdApproved']) for row in rows)
+        )
 
         samples = []
         for row in rows:
+            url_new = url_map.get(row['articleIdNew'])
+            url_approved = url_map.get(row['articleIdApproved'])
             sample = {
                 'articleIdNew': row['articleIdNew'],
                 'articleIdApproved': row['articleIdApproved'],
                 'urlCheck': row['urlCheck'],
-                'urlNew': row['urlNew'],
-                'urlApproved': row['urlApproved'],
-                'canonicalNew': self.canonicalizer.canonicalize_url(row['urlNew']),
-                'canonicalApproved': self.canonicalizer.canonicalize_url(row['urlApproved'])
+                'urlNew': url_new,
+                'urlApproved': url_approved,
+                'canonicalNew': self.canonicalizer.canonicalize_url(url_new),
+                'canonicalApproved': self.canonicalizer.canonicalize_url(url_approved)
             }
             samples.append(sample)
 
@@ -3,30 +3,68 @@ URL canonicalization utilities for NewsNexus Deduper
 
 Provides functions to normalize URLs for comparison by removing
 tracking parameters, normalizing domains, and standardizing format.
+
+Fully type-annotated so it can optionally be compiled with mypyc
+(`mypyc utils/canonical_url.py` from src/); the compiled extension is
+imported in place of this file and behaves identically.
 """
 
+import json
+import os
 import re
-from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
-from typing import Optional
+from functools import lru_cache
+from operator import itemgetter
+from pathlib import Path
+from urllib.parse import quote_plus, unquote_plus, urlsplit
+from typing import Callable, Dict, Optional, Tuple
+
+# Trailing default port on a host
+PORT_RE = re.compile(r':(?:80|443)$')
+
+# Query keys/values made only of these characters survive a decode/re-encode
+# round trip unchanged, so they skip unquote_plus/quote_plus
+_QUERY_SAFE_RE = re.compile(r'[a-z0-9_.~-]*')
+
+# Characters urllib strips from anywhere in a URL before parsing
+_URL_UNSAFE_CHARS = str.maketrans('', '', '\t\r\n')
+
+# Common tracking parameters to remove (lowercase; URLs are lowercased first)
+_TRACKING_PARAMS = frozenset({
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'gclid', 'fbclid', 'msclkid', 'dclid', 'gclsrc',
+    '_ga', '_gl', 'mc_eid', 'mc_cid',
+    'ref', 'referrer', 'source', 'campaign',
+    'wt.mc_id', 'wt.z_author', 'ncid'
+})
+
+# Common subdomains to normalize
+_WWW_VARIANTS = frozenset({'www', 'www2', 'www3', 'm', 'mobile'})
+
+
+def _requote(component: str) -> str:
+    """Encode a query component exactly as parse_qs followed by urlencode would"""
+    if _QUERY_SAFE_RE.fullmatch(component):
+        return component
+    return quote_plus(unquote_plus(component))
 
 
 class URLCanonicalizer:
     """Handles URL canonicalization for duplicate detection"""
 
-    # Common tracking parameters to remove
-    TRACKING_PARAMS = {
-        'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
-        'gclid', 'fbclid', 'msclkid', 'dclid', 'gclsrc',
-        '_ga', '_gl', 'mc_eid', 'mc_cid',
-        'ref', 'referrer', 'source', 'campaign',
-        'WT.mc_id', 'WT.z_author', 'ncid'
-    }
+    # Class-level aliases of the module constants, kept for callers
+    TRACKING_PARAMS = _TRACKING_PARAMS
+    WWW_VARIANTS = _WWW_VARIANTS
 
-    # Common subdomains to normalize
-    WWW_VARIANTS = {'www', 'www2', 'www3', 'm', 'mobile'}
+    # Distinct raw URL strings whose canonical form is memoized
+    CACHE_SIZE = 262144
 
-    def __init__(self):
-        pass
+    # Bump whenever canonical output changes, so caches saved by
+    # save_cache under the old rules are discarded
+    CACHE_VERSION = 1
+
+    def __init__(self) -> None:
+        # The same URL string recurs across articles and pairs; parse it once
+        self._canonicalize_cached: Callable[[str], Optional[str]] = lru_cache(maxsize=self.CACHE_SIZE)(self._canonicalize)
 
     def canonicalize_url(self, url: Optional[str]) -> Optional[str]:
         """
@@ -41,62 +79,142 @@ class URLCanonicalizer:
         if not url or not isinstance(url, str):
             return None
 
-        url = url.strip()
-        if not url:
-            return None
+        return self._canonicalize_cached(url)
 
-        try:
-            # Add protocol if missing
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
+    def load_cache(self, path: Path) -> Dict[str, Optional[str]]:
+        """
+        Load a raw-to-canonical URL mapping written by save_cache.
 
-            # Parse the URL
-            parsed = urlparse(url.lower())
+        The cache is plain JSON, so reading a file someone else wrote can
+        never run code.
 
-            # Skip invalid URLs
-            if not parsed.netloc:
-                return None
+        Args:
+            path: Cache file
 
-            # Normalize the domain
-            domain = self._normalize_domain(parsed.netloc)
+        Returns:
+            The mapping, or an empty dict if the file is missing, unreadable,
+            malformed or from a different CACHE_VERSION
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(data, dict) or data.get('version') != self.CACHE_VERSION:
+            return {}
+        mapping = data.get('urls')
+        if not isinstance(mapping, dict):
+            return {}
+        if not all(isinstance(value, str) or value is None for value in mapping.values()):
+            return {}
+
+        urls: Dict[str, Optional[str]] = mapping
+        return urls
+
+    def save_cache(self, path: Path, mapping: Dict[str, Optional[str]]) -> None:
+        """
+        Persist a raw-to-canonical URL mapping for load_cache.
 
-            # Normalize the path
-            path = self._normalize_path(parsed.path)
+        Written to a temporary file and renamed into place, so readers never
+        see a partially written cache. There is no lock: when two runs
+        overlap, the last one to finish replaces the file and the other
+        run's entries are lost (they are simply recomputed next time).
 
-            # Clean query parameters
-            query = self._clean_query_params(parsed.query)
+        Args:
+            path: Cache file
+            mapping: Raw URL to canonical URL (None if invalid)
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.CACHE_VERSION, 'urls': mapping}, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _canonicalize(self, url: str) -> Optional[str]:
+        """
+        Uncached canonicalization of a non-empty URL string.
 
-            # Remove fragment (anchor)
-            fragment = ''
+        Splits the URL with str.partition rather than urllib.parse; the
+        result matches urlparse/urlunparse for http(s) URLs.
+        """
+        url = url.strip().lower().translate(_URL_UNSAFE_CHARS)
+        if not url:
+            return None
 
-            # Reconstruct the URL
-            canonical = urlunparse((
-                'https',  # Always use HTTPS
-                domain,
-                path,
-                parsed.params,
-                query,
-                fragment
-            ))
+        try:
+            netloc, rest = self._split_netloc(url)
 
-            return canonical
+            # Skip invalid URLs; bracketed (IPv6) hosts are rare enough to
+            # leave their validation to urllib
+            if not netloc:
+                return None
+            if '[' in netloc or ']' in netloc:
+                urlsplit('//' + netloc)
+
+            # Remove fragment (anchor), then split off the query
+            rest = rest.partition('#')[0]
+            path, _, query = rest.partition('?')
+
+            # Path parameters (';...') belong to the last path segment only
+            params = ''
+            semicolon = path.find(';', path.rfind('/'))
+            if semicolon != -1:
+                path, params = path[:semicolon], path[semicolon + 1:]
+
+            domain = self._normalize_domain(netloc)
+            path = self._normalize_path(path)
+            if params:
+                path = f"{path};{params}"
+            query = self._clean_query_params(query)
+
+            # A host that normalizes away leaves a '//' path to carry the
+            # authority, as urlunparse does
+            prefix = 'https:' if not domain and path.startswith('//') else f"https://{domain}"
+            if query:
+                return f"{prefix}{path}?{query}"
+            return f"{prefix}{path}"
 
         except Exception:
             return None
 
+    def _split_netloc(self, url: str) -> Tuple[str, str]:
+        """Split a stripped, lowercased URL into its host and everything after it"""
+        # Drop the scheme; every canonical URL uses https
+        if url.startswith('https://'):
+            rest = url[8:]
+        elif url.startswith('http://'):
+            rest = url[7:]
+        else:
+            rest = url
+
+        # Host runs up to the first '/', '?' or '#'
+        end = len(rest)
+        for delimiter in '/?#':
+            index = rest.find(delimiter)
+            if index != -1 and index < end:
+                end = index
+        return rest[:end], rest[end:]
+
+    def _host_key(self, url: str) -> str:
+        """Normalized host of a URL, as its canonical form would have it, without the full parse"""
+        netloc, _ = self._split_netloc(url.strip().lower().translate(_URL_UNSAFE_CHARS))
+        return self._normalize_domain(netloc)
+
     def _normalize_domain(self, domain: str) -> str:
-        """Normalize domain name"""
-        domain = domain.lower().strip()
+        """Normalize an already-lowercased domain name"""
+        domain = domain.strip()
 
         # Remove port if it's default (80, 443)
         if ':80' in domain or ':443' in domain:
-            domain = re.sub(r':(80|443)$', '', domain)
+            domain = PORT_RE.sub('', domain)
 
-        # Handle www and mobile subdomains
-        parts = domain.split('.')
-        if len(parts) >= 3 and parts[0] in self.WWW_VARIANTS:
+        # Handle www and mobile subdomains, only when at least two labels remain
+        subdomain, _, remainder = domain.partition('.')
+        if subdomain in _WWW_VARIANTS and '.' in remainder:
             # Remove common subdomains like www, m, mobile
-            domain = '.'.join(parts[1:])
+            domain = remainder
 
         return domain
 
@@ -120,23 +238,27 @@ class URLCanonicalizer:
         if not query:
             return ''
 
-        try:
-            params = parse_qs(query, keep_blank_values=False)
-
-            # Remove tracking parameters
-            cleaned_params = {
-                key: value for key, value in params.items()
-                if key.lower() not in self.TRACKING_PARAMS
-            }
-
-            # Sort parameters for consistent ordering
-            if cleaned_params:
-                return urlencode(sorted(cleaned_params.items()), doseq=True)
+        # Same output as parse_qs(keep_blank_values=False) -> filter ->
+        # urlencode(sorted(...), doseq=True), without the intermediate dict
+        params = []
+        for field in query.split('&'):
+            key, sep, value = field.partition('=')
+            if not value:
+                continue  # Blank values are dropped
+            if _QUERY_SAFE_RE.fullmatch(key):
+                # Already lowercase and needs no re-encoding
+                if key in _TRACKING_PARAMS:
+                    continue
+                params.append((key, key, _requote(value)))
             else:
-                return ''
+                name = unquote_plus(key)
+                if name.lower() in _TRACKING_PARAMS:
+                    continue
+                params.append((name, quote_plus(name), _requote(value)))
 
-        except Exception:
-            return query  # Return original if parsing fails
+        # Stable sort by decoded key keeps repeated keys' values in original order
+        params.sort(key=itemgetter(0))
+        return '&'.join(f"{key}={value}" for _, key, value in params)
 
     def urls_match(self, url1: Optional[str], url2: Optional[str]) -> bool:
         """
@@ -149,6 +271,14 @@ class URLCanonicalizer:
         Returns:
             True if URLs match after canonicalization
         """
+        # Most compared pairs are on different hosts; reject those before
+        # canonicalizing. An empty host is left to the full comparison.
+        if url1 and url2 and isinstance(url1, str) and isinstance(url2, str) and url1 != url2:
+            host1 = self._host_key(url1)
+            host2 = self._host_key(url2)
+            if host1 and host2 and host1 != host2:
+                return False
+
         canonical1 = self.canonicalize_url(url1)
         canonical2 = self.canonicalize_url(url2)
 
@@ -171,8 +301,14 @@ class URLCanonicalizer:
         if not canonical:
             return None
 
-        try:
-            parsed = urlparse(canonical)
-            return parsed.netloc
-        except Exception:
-            return None
\ No newline at end of file
+        # Canonical URLs always start with 'https://' and have a '/' path
+        return canonical[len('https://'):].partition('/')[0]
+
+# Shared instance behind canonicalize_url, so worker processes each build
+# their own memo cache on import
+_default_canonicalizer = URLCanonicalizer()
+
+
+def canonicalize_url(url: Optional[str]) -> Optional[str]:
+    """Module-level (picklable) form of URLCanonicalizer.canonicalize_url for process pools"""
+    return _default_canonicalizer.canonicalize_url(url)
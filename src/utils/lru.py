@@ -0,0 +1,38 @@
+"""
+Size-bounded LRU mapping for NewsNexus Deduper
+"""
+
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache(OrderedDict):
+    """
+    Dictionary that evicts its least recently used entry once maxsize is reached.
+
+    Reads through [] or get() mark an entry as recently used; membership
+    tests (`in`) do not.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        return default
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        if key in self:
+            self.move_to_end(key)
+        super().__setitem__(key, value)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
@@ -19,14 +19,14 @@ def timer(description: str) -> Generator[None, None, None]:
         with timer("Loading data"):
             load_data()
     """
-    start_time = time.time()
+    # Monotonic, high-resolution clock; unaffected by wall-clock adjustments
+    start_time = time.perf_counter()
     print(f"{description}...")
 
     try:
         yield
     finally:
-        end_time = time.time()
-        duration = end_time - start_time
+        duration = time.perf_counter() - start_time
 
         if duration < 60:
             print(f"{description} completed in {duration:.2f} seconds")
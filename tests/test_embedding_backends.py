@@ -0,0 +1,95 @@
+"""
+Parity check between the torch and ONNX embedding backends.
+
+Encodes a few fixed texts through EmbeddingProcessor with each backend and
+requires the embeddings to agree. Skipped unless sentence-transformers 3.2+
+and ONNX Runtime are installed and the model can be loaded.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+import importlib.util
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+TEXTS = [
+    "City council approves new budget for road repairs",
+    "Local team wins championship after overtime thriller",
+    "Recall issued for contaminated lettuce sold in three states",
+    "Storm knocks out power to thousands of homes overnight",
+]
+
+# Minimum per-text cosine similarity between a backend and torch. The fp32
+# ONNX export differs from torch only by floating-point round-off; the int8
+# export also rounds weights and activations, so it gets a looser bound
+ONNX_TOLERANCE = 0.999
+QUANTIZED_TOLERANCE = 0.99
+QUANTIZED_MODEL_FILE = 'onnx/model_qint8_avx512.onnx'
+
+
+def _onnx_backend_available() -> bool:
+    """sentence-transformers 3.2+ with its ONNX extras installed"""
+    if importlib.util.find_spec('sentence_transformers') is None:
+        return False
+    if importlib.util.find_spec('onnxruntime') is None or importlib.util.find_spec('optimum') is None:
+        return False
+    import sentence_transformers
+    major, minor = (int(part) for part in sentence_transformers.__version__.split('.')[:2])
+    return (major, minor) >= (3, 2)
+
+
+@unittest.skipUnless(_onnx_backend_available(), "needs sentence-transformers 3.2+ with the [onnx] extras")
+class EmbeddingBackendParityTest(unittest.TestCase):
+    """ONNX (and quantized ONNX) embeddings must match the torch backend"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._store_dir = tempfile.TemporaryDirectory()
+        cls.reference = cls._encode('torch')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._store_dir.cleanup()
+
+    @classmethod
+    def _encode(cls, backend, model_file=None):
+        """Encode TEXTS through EmbeddingProcessor, skipping if the model cannot be loaded"""
+        from metrics.embeddings import EmbeddingProcessor
+
+        processor = EmbeddingProcessor(
+            None, MODEL_NAME, cache_size=16, backend=backend, model_file=model_file,
+            workers=1, store_dir=Path(cls._store_dir.name) / backend
+        )
+        try:
+            processor._load_model()
+        except OSError as e:
+            raise unittest.SkipTest(f"could not load {MODEL_NAME} with the {backend} backend: {e}")
+        return processor._encode_texts(TEXTS).astype('float32')
+
+    def _assert_parity(self, embeddings, tolerance):
+        # Renormalize after the float16 cast, whose rounding alone would cost
+        # a few 1e-4 of the dot product and eat into the fp32 bound
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        reference = self.reference / np.linalg.norm(self.reference, axis=1, keepdims=True)
+        similarities = (embeddings * reference).sum(axis=1)
+        for text, similarity in zip(TEXTS, similarities):
+            self.assertGreaterEqual(similarity, tolerance, f"cosine {similarity:.4f} for {text!r}")
+
+    def test_onnx_matches_torch(self):
+        self._assert_parity(self._encode('onnx'), ONNX_TOLERANCE)
+
+    def test_quantized_onnx_matches_torch(self):
+        self._assert_parity(self._encode('onnx', QUANTIZED_MODEL_FILE), QUANTIZED_TOLERANCE)
+
+
+if __name__ == '__main__':
+    unittest.main()